@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import numpy as np
+logger = logging.getLogger(__name__)
+
+import hist_arrays
+
+# Columnar on-disk cache of the one dimensional histograms of a ROOT file. It is enabled by setting a cache directory (see set_cache_dir or the
+# environment variable DUMBLEDRAW_ARRAY_CACHE), then the parsers serve get_arrays from the cache and the file is exported on first use.
+# Each file is stored in its own directory <cache_dir>/<sha1 of the path>/ with
+#   index.json     source path, modification time and size, and per histogram the offsets into the columns
+#   edges.npy      bin edges of all histograms
+#   contents.npy   bin contents of all histograms including under- and overflow cells
+#   sumw2.npy      squared weights of all histograms including under- and overflow cells
+# The columns are memory mapped, so reads are slices of the page cache shared by all processes. The cache of a file is rebuilt
+# if modification time or size of the file change. Histograms with asymmetric errors (e.g. Poisson) are not cached.
+
+_format_version = 1
+_columns = ["edges", "contents", "sumw2"]
+_cache_dir = [os.environ.get("DUMBLEDRAW_ARRAY_CACHE")]
+# loaded caches by absolute path of the source file
+_caches = {}
+# a lock older than this (in seconds) is left over from an aborted export
+_lock_timeout = 3600.
+
+
+def set_cache_dir(directory):
+    _cache_dir[0] = directory
+
+
+def enabled():
+    return _cache_dir[0] != None
+
+
+def _fingerprint(filename):
+    status = os.stat(filename)
+    return [status.st_mtime, status.st_size]
+
+
+def _cache_path(filename, cache_dir):
+    return os.path.join(cache_dir, hashlib.sha1(os.path.abspath(filename).encode("utf-8")).hexdigest())
+
+
+class ArrayCache(object):
+    def __init__(self, path):
+        with open(os.path.join(path, "index.json")) as indexfile:
+            index = json.load(indexfile)
+        self._path = path
+        self._source = index["source"]
+        self._fingerprint = index["fingerprint"]
+        self._version = index["version"]
+        self._keys = index["keys"]
+        self._columns = dict((column, np.load(os.path.join(path, column + ".npy"), mmap_mode="r")) for column in _columns)
+
+    @property
+    def source(self):
+        return self._source
+
+    @property
+    def fingerprint(self):
+        return self._fingerprint
+
+    def is_fresh(self):
+        return self._version == _format_version and os.path.exists(self._source) and self._fingerprint == _fingerprint(self._source)
+
+    def keys(self):
+        return list(self._keys.keys())
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    # returns read-only views of the edges, contents and squared weights (including under- and overflow cells) of the histogram
+    def get_cells(self, key):
+        edges_offset, nedges, cells_offset, ncells = self._keys[key]
+        return (self._columns["edges"][edges_offset:edges_offset + nedges],
+                self._columns["contents"][cells_offset:cells_offset + ncells],
+                self._columns["sumw2"][cells_offset:cells_offset + ncells])
+
+    # returns edges, contents, upper and lower errors of the bins as hist_arrays.get_arrays, edges and contents are read-only views
+    def get_arrays(self, key):
+        edges, contents, sumw2 = self.get_cells(key)
+        errors = np.sqrt(sumw2[1:-1])
+        return edges, contents[1:-1], errors, errors.copy()
+
+
+# returns the path and key of all histograms below a directory of the file
+def _walk(tdirectory, prefix=""):
+    import ROOT
+    seen = set()
+    for key in tdirectory.GetListOfKeys():
+        name = key.GetName()
+        # only the highest cycle of each name is used, which is listed first
+        if name in seen:
+            continue
+        seen.add(name)
+        tclass = ROOT.TClass.GetClass(key.GetClassName())
+        if not tclass:
+            continue
+        if tclass.InheritsFrom("TDirectory"):
+            for entry in _walk(key.ReadObj(), prefix + name + "/"):
+                yield entry
+        elif tclass.InheritsFrom("TH1"):
+            yield prefix + name, key
+
+
+# exports all one dimensional histograms of the file to the cache directory and returns the cache.
+# The cache is written to a temporary directory first, so that readers never see a partial cache.
+def export(filename, cache_dir=None):
+    import ROOT
+    if cache_dir == None:
+        cache_dir = _cache_dir[0]
+    start = time.time()
+    fingerprint = _fingerprint(filename)
+    rootfile = ROOT.TFile(filename, "READ")
+    if not rootfile or rootfile.IsZombie():
+        logger.fatal("Cannot open rootfile %s to export it!" % filename)
+        raise Exception
+    keys = {}
+    columns = dict((column, []) for column in _columns)
+    offsets = [0, 0]
+    for path, key in _walk(rootfile):
+        hist = key.ReadObj()
+        # detached from the file and owned by python, so that each histogram is deleted once its arrays are copied
+        hist.SetDirectory(0)
+        ROOT.SetOwnership(hist, True)
+        if hist.GetDimension() != 1 or hist.GetBinErrorOption() != hist.kNormal:
+            continue
+        contents = hist_arrays.get_contents(hist)
+        edges = hist_arrays.get_edges(hist)
+        columns["edges"].append(edges)
+        columns["contents"].append(contents)
+        columns["sumw2"].append(hist_arrays.get_sumw2(hist, contents))
+        keys[path] = [offsets[0], len(edges), offsets[1], len(contents)]
+        offsets[0] += len(edges)
+        offsets[1] += len(contents)
+    rootfile.Close()
+    path = _cache_path(filename, cache_dir)
+    tmp_path = "%s.%i.tmp" % (path, os.getpid())
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+    for column in _columns:
+        values = np.concatenate(columns[column]) if len(columns[column]) > 0 else np.zeros(0, dtype=np.float64)
+        np.save(os.path.join(tmp_path, column + ".npy"), values)
+    with open(os.path.join(tmp_path, "index.json"), "w") as indexfile:
+        json.dump({
+            "source": os.path.abspath(filename),
+            "fingerprint": fingerprint,
+            "version": _format_version,
+            "keys": keys
+        }, indexfile)
+    if os.path.exists(path):
+        shutil.rmtree(path, ignore_errors=True)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:  # written in the meantime by another process
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    logger.info("Exported %i histograms of %s to %s in %.2f s" % (len(keys), filename, path, time.time() - start))
+    return ArrayCache(path)
+
+
+def _read(filename, cache_dir):
+    path = _cache_path(filename, cache_dir)
+    if not os.path.exists(os.path.join(path, "index.json")):
+        return None
+    try:
+        cache = ArrayCache(path)
+    except (IOError, OSError, ValueError, KeyError) as error:
+        logger.warning("Cannot read array cache of %s: %s" % (filename, error))
+        return None
+    return cache if cache.is_fresh() else None
+
+
+# exports the file unless another process is already exporting it, in which case None is returned
+def _export_locked(filename, cache_dir):
+    if not os.path.isdir(cache_dir):
+        try:
+            os.makedirs(cache_dir)
+        except OSError:  # created in the meantime by another worker
+            pass
+    lock = _cache_path(filename, cache_dir) + ".lock"
+    if os.path.exists(lock) and time.time() - os.path.getmtime(lock) > _lock_timeout:
+        logger.warning("Removing stale lock %s" % lock)
+        os.remove(lock)
+    try:
+        os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except OSError:
+        logger.debug("Array cache of %s is being exported by another process" % filename)
+        return None
+    try:
+        return export(filename, cache_dir)
+    finally:
+        os.remove(lock)
+
+
+# returns the cache of the file, which is exported if it is missing or outdated and build is set.
+# Returns None if the cache is disabled or not available, then the histograms have to be read from the file.
+def load(filename, cache_dir=None, build=True):
+    if cache_dir == None:
+        cache_dir = _cache_dir[0]
+    if cache_dir == None:
+        return None
+    path = os.path.abspath(filename)
+    if path in _caches and _caches[path].is_fresh():
+        return _caches[path]
+    cache = _read(filename, cache_dir)
+    if cache == None and build:
+        cache = _export_locked(filename, cache_dir)
+    if cache != None:
+        _caches[path] = cache
+    else:
+        _caches.pop(path, None)
+    return cache
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import numpy as np
+logger = logging.getLogger(__name__)
+
+import hist_arrays
+
+# Total uncertainty bands of the sum of several processes from the systematic Up/Down shapes of control plot files, e.g.
+#
+# band = bands.read_band(parser, "2016", "mt", "inclusive", ["ZTT", "ZL", "TTT", "W", "QCD"])
+# plot.add_graph(bands.band_graph(band), "unc")
+#
+# The variations of all processes are read into (process, systematic, bin) arrays and the shifts of the same systematic are
+# summed over the processes (fully correlated) before the systematics are combined. ROOT is only needed to read the shapes and to build the graph.
+
+# combination methods of the shifts of the different systematics
+_methods = ["quadrature", "envelope"]
+
+
+# returns the upper and lower uncertainties per bin from the nominal (process, bin) and the up and down (process, systematic, bin) arrays.
+#   method "quadrature": positive and negative shifts of each systematic are added in quadrature
+#   method "envelope":   the largest positive and negative shift of any systematic
+# If sumw2 (process, bin) is given, the statistical uncertainty of the summed nominal shapes is added in quadrature.
+def combine_shifts(nominal, up, down, method="quadrature", sumw2=None):
+    if not method in _methods:
+        logger.fatal("Unknown method %s to combine the systematic shifts, use one of %s!" % (method, _methods))
+        raise Exception
+    nominal = np.asarray(nominal, dtype=np.float64)
+    shift_up = (np.asarray(up, dtype=np.float64) - nominal[:, np.newaxis, :]).sum(axis=0)
+    shift_down = (np.asarray(down, dtype=np.float64) - nominal[:, np.newaxis, :]).sum(axis=0)
+    # a systematic may shift a bin in the same direction for both variations
+    positive = np.maximum(np.maximum(shift_up, shift_down), 0.)
+    negative = np.maximum(np.maximum(-shift_up, -shift_down), 0.)
+    if positive.shape[0] == 0:
+        err_up = np.zeros(nominal.shape[1], dtype=np.float64)
+        err_down = np.zeros(nominal.shape[1], dtype=np.float64)
+    elif method == "quadrature":
+        err_up = np.sqrt(np.square(positive).sum(axis=0))
+        err_down = np.sqrt(np.square(negative).sum(axis=0))
+    else:
+        err_up = positive.max(axis=0)
+        err_down = negative.max(axis=0)
+    if sumw2 is not None:
+        stat = np.asarray(sumw2, dtype=np.float64).sum(axis=0)
+        err_up = np.sqrt(np.square(err_up) + stat)
+        err_down = np.sqrt(np.square(err_down) + stat)
+    return err_up, err_down
+
+
+# reads the nominal and the Up/Down shapes of the processes from a control plot file of Rootfile_parser and returns a dictionary with
+# bin edges, summed nominal contents and the upper and lower uncertainties (without under- and overflow).
+# Without given systematics all systematics found in the key index for any of the processes are used. Processes without a given
+# systematic do not contribute to its shift.
+def read_band(parser, era, channel, category, processes, systematics=None, method="quadrature", mc_stat=True):
+    if isinstance(processes, basestring):
+        processes = [processes]
+    available = dict((process, parser.available_systematics(era, channel, category, process)) for process in processes)
+    if systematics == None:
+        systematics = sorted(set([syst for process in processes for syst in available[process]]))
+    edges = None
+    nominal = None
+    sumw2 = None
+    for i, process in enumerate(processes):
+        # only existing shapes are requested, so that get_many does not return empty dummies for missing variations
+        systs = [syst for syst in systematics if syst in available[process]]
+        hists = parser.get_many(era, channel, category, process,
+                                [None] + [syst + "Up" for syst in systs] + [syst + "Down" for syst in systs])
+        hist = hists[(era, channel, category, process, None)]
+        contents = hist_arrays.get_contents(hist)
+        if nominal is None:
+            edges = hist_arrays.get_edges(hist)
+            nominal = np.zeros((len(processes), len(contents)), dtype=np.float64)
+            sumw2 = np.zeros((len(processes), len(contents)), dtype=np.float64)
+            up = np.empty((len(processes), len(systematics), len(contents)), dtype=np.float64)
+            down = np.empty((len(processes), len(systematics), len(contents)), dtype=np.float64)
+        nominal[i] = contents
+        sumw2[i] = hist_arrays.get_sumw2(hist, contents)
+        up[i] = contents
+        down[i] = contents
+        for j, syst in enumerate(systematics):
+            if syst in systs:
+                up[i, j] = hist_arrays.get_contents(hists[(era, channel, category, process, syst + "Up")])
+                down[i, j] = hist_arrays.get_contents(hists[(era, channel, category, process, syst + "Down")])
+    if nominal is None:
+        logger.fatal("No processes given to build the uncertainty band!")
+        raise Exception
+    logger.debug("Combined %i systematics of %i processes" % (len(systematics), len(processes)))
+    err_up, err_down = combine_shifts(nominal[:, 1:-1], up[:, :, 1:-1], down[:, :, 1:-1], method,
+                                      sumw2[:, 1:-1] if mc_stat else None)
+    return {
+        "edges": edges,
+        "nominal": nominal[:, 1:-1].sum(axis=0),
+        "err_up": err_up,
+        "err_down": err_down,
+        "systematics": systematics
+    }
+
+
+# returns the band as TGraphAsymmErrors with points at the bin centers, which can be passed to add_graph
+def band_graph(band, name="unc"):
+    import ROOT as R
+    edges = band["edges"]
+    centers = 0.5 * (edges[1:] + edges[:-1])
+    half_widths = 0.5 * np.diff(edges)
+    graph = R.TGraphAsymmErrors(
+        len(centers), np.ascontiguousarray(centers), np.ascontiguousarray(band["nominal"]), half_widths,
+        half_widths.copy(), np.ascontiguousarray(band["err_down"]), np.ascontiguousarray(band["err_up"]))
+    graph.SetName(name)
+    graph.SetTitle(name)
+    return graph
+
+
+# returns the band as TH1D with the nominal contents and the symmetrized uncertainties as bin errors, e.g. to be drawn with "e2"
+def band_hist(band, name="unc"):
+    import ROOT as R
+    edges = band["edges"]
+    hist = R.TH1D(name, name, len(edges) - 1, np.ascontiguousarray(edges))
+    hist.SetDirectory(0)
+    hist.Sumw2()
+    nominal = np.zeros(len(edges) + 1, dtype=np.float64)
+    nominal[1:-1] = band["nominal"]
+    errors = np.zeros(len(edges) + 1, dtype=np.float64)
+    errors[1:-1] = 0.5 * (band["err_up"] + band["err_down"])
+    hist_arrays.set_contents(hist, nominal)
+    hist_arrays.set_sumw2(hist, np.square(errors))
+    return hist
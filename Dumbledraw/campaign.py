@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import multiprocessing
+import os
+import time
+import traceback
+logger = logging.getLogger(__name__)
+
+import styles
+import rootfile_pool
+import profiling
+
+
+# sets up ROOT and the plotting style once per worker process. Plots produced by the tasks should therefore be booked with style "none".
+def _init_worker(style, style_kwargs, forked=True):
+    import ROOT as R
+    R.gROOT.SetBatch(True)
+    # file handles inherited from the parent process must not be shared between processes
+    if forked:
+        rootfile_pool.forget_all()
+        # profiling records of the parent process are reported by the parent
+        profiling.take_records()
+        profiling.take_pending()
+    styles.SetStyle(style, **style_kwargs)
+
+
+def _run_task(args):
+    index, function, task = args
+    start = time.time()
+    result = None
+    error = None
+    try:
+        result = function(task)
+    except Exception:
+        error = traceback.format_exc()
+        logger.error("Task %s failed:\n%s" % (str(task), error))
+    return {
+        "index": index,
+        "task": task,
+        "result": result,
+        "error": error,
+        "time": time.time() - start,
+        "pid": os.getpid(),
+        "profile": profiling.take_records() if profiling.enabled() else None
+    }
+
+
+# runs function(task) for all tasks, e.g. one task per (variable, channel, category) plot, and returns a list
+# with the result, error traceback and timing of each task in the order of the inputs.
+# With nprocesses > 1 the tasks are distributed over a pool of worker processes, so function and tasks must be picklable.
+def run_campaign(function,
+                 tasks,
+                 nprocesses=1,
+                 style="ModTDR",
+                 style_kwargs=None,
+                 maxtasksperchild=None):
+    if style_kwargs == None:
+        style_kwargs = {}
+    start = time.time()
+    arguments = [(i, function, task) for i, task in enumerate(tasks)]
+    if nprocesses <= 1:
+        _init_worker(style, style_kwargs, forked=False)
+        results = [_run_task(argument) for argument in arguments]
+    else:
+        pool = multiprocessing.Pool(
+            processes=nprocesses,
+            initializer=_init_worker,
+            initargs=(style, style_kwargs),
+            maxtasksperchild=maxtasksperchild)
+        try:
+            # chunks of single tasks keep the workers balanced for plots of different complexity
+            results = list(pool.imap_unordered(_run_task, arguments, 1))
+        finally:
+            pool.close()
+            pool.join()
+        results.sort(key=lambda result: result["index"])
+    if profiling.enabled():
+        for result in results:
+            profiling.add_records(result.pop("profile"))
+        profiling.write_report()
+    nfailed = len([result for result in results if result["error"] != None])
+    logger.info("Processed %i tasks with %i processes in %.1f s, %i failed" %
+                (len(results), max(nprocesses, 1), time.time() - start, nfailed))
+    return results
@@ -11,10 +11,98 @@ import math
 logger = logging.getLogger(__name__)
 
 import styles
+import hist_arrays
+import profiling
 import os
+import sys
+import time
+
+# formats which save_all writes from a single image of the painted canvas
+_raster_formats = ["png", "gif", "jpg", "jpeg", "tiff", "xpm"]
+
+
+# identifies a histogram object. PyROOT may return different proxies for the same C++ object, so TH1s are identified by their address.
+def _object_key(hist):
+    if isinstance(hist, hist_arrays.ArrayHist):
+        return ("array", id(hist))
+    return ("root", R.AddressOf(hist)[0])
+
+
+def _is_stack(hist):
+    return isinstance(hist, R.THStack) or isinstance(hist, hist_arrays.ArrayStack)
+
+
+# returns the ROOT object to be drawn, which is created at this point for histograms and stacks held as arrays
+def _root_object(hist):
+    if isinstance(hist, hist_arrays.ArrayHist) or isinstance(hist, hist_arrays.ArrayStack):
+        return hist.th1()
+    return hist
+
+
+# adds or divides histograms, staying with arrays if the modified histogram is an ArrayHist
+def _add(hist, other):
+    if isinstance(hist, hist_arrays.ArrayHist):
+        hist.Add(other)
+    else:
+        hist.Add(_root_object(other))
+
+
+def _divide(hist, denominator):
+    if isinstance(hist, hist_arrays.ArrayHist):
+        hist.Divide(denominator)
+    else:
+        hist.Divide(_root_object(denominator))
+
+
+# hands a ROOT object over to Python, so that it is deleted as soon as the last reference is dropped, see Plot.close
+def _release(obj):
+    if isinstance(obj, hist_arrays.ArrayHist) or isinstance(obj, hist_arrays.ArrayStack):
+        obj = obj.release()
+    if obj == None:
+        return
+    if isinstance(obj, R.TH1):
+        obj.SetDirectory(0)
+    R.SetOwnership(obj, True)
+
+
+# returns the sizes of the ROOT object lists, which must not grow with the number of closed plots
+def _root_object_counts():
+    return {
+        "canvases": R.gROOT.GetListOfCanvases().GetSize(),
+        "directory": R.gDirectory.GetList().GetSize(),
+        "cleanups": R.gROOT.GetListOfCleanups().GetSize()
+    }
+
+
+# histogram registered via Plot.add_hist in shared mode. All subplots reference the same copy of the histogram
+# and a subplot clones it only right before modifying it (copy-on-write).
+class SharedHist(object):
+    __slots__ = ["hist", "owners", "stats"]
+
+    def __init__(self, hist, owners, stats):
+        self.hist = copy.deepcopy(hist)
+        self.owners = owners
+        self.stats = stats
+
+
+# histogram, stack or graph registered in a subplot together with its group name and draw option (markerstyle).
+# shared refers to the SharedHist of the histogram as long as it has not been cloned by the subplot.
+class HistEntry(object):
+    __slots__ = ["hist", "group", "style", "shared"]
+
+    def __init__(self, hist, group, style="", shared=None):
+        self.hist = hist
+        self.group = group
+        self.style = style
+        self.shared = shared
+
+    # read-only access as the former [hist, group, style] lists, e.g. subplot.get_graph(name)[0] or hist, group, style = entry
+    def __getitem__(self, index):
+        return (self.hist, self.group, self.style)[index]
+
 
 class Plot(object):
-    def __init__(self, splitlist, style="none", **kwargs):
+    def __init__(self, splitlist, style="none", share_hists=False, **kwargs):
         styles.SetStyle(style, **kwargs)
         R.gROOT.SetBatch(True)  # don't disply canvas
         self._canvas = R.TCanvas()
@@ -22,6 +110,11 @@ class Plot(object):
         self._subplots = []
         self._legends = []
         self._lines = []
+        # with share_hists, histograms added to all subplots are only copied once, see SharedHist
+        self._share_hists = share_hists
+        self._clone_stats = {"avoided": 0, "cloned": 0}
+        self._closed = False
+        self._initial_counts = _root_object_counts()
         # evaluate splitlist and book
         if isinstance(splitlist, basestring):
             splitlist = [splitlist]
@@ -52,6 +145,15 @@ class Plot(object):
     def nlegends(self):
         return len(self._legends) 
 
+    @property
+    def nlines(self):
+        return len(self._lines)
+
+    # number of histogram copies avoided and made later on by the shared histogram mode
+    @property
+    def clone_stats(self):
+        return dict(self._clone_stats)
+
     def subplot(self, index):
         if not isinstance(index, int):
             logger.fatal("Subplot index is supposed to be of type int!")
@@ -79,10 +181,70 @@ class Plot(object):
             raise Exception
         return self._lines[index]
 
+    # deletes the canvas, pads, legends, lines and histograms of the plot, e.g. once it is saved. The plot cannot be used afterwards.
+    # Returns the growth of the ROOT object lists since the plot was created, which is logged if verify is set.
+    def close(self, verify=True):
+        if self._closed:
+            return {}
+        # objects drawn by the pads themselves (e.g. labels) are deleted by ROOT
+        self._canvas.Clear()
+        self._canvas.Close()
+        for legend in self._legends:
+            legend.close()
+        for line in self._lines:
+            line.close()
+        for subplot in self._subplots:
+            subplot.close()
+        self._legends = []
+        self._lines = []
+        self._subplots = []
+        _release(self._canvas)
+        self._canvas = None
+        self._closed = True
+        counts = _root_object_counts()
+        growth = dict((key, counts[key] - self._initial_counts[key]) for key in counts)
+        if verify and any([value > 0 for value in growth.values()]):
+            logger.warning("ROOT object lists grew after closing plot: %s" % ", ".join(
+                ["%s +%i" % (key, value) for key, value in sorted(growth.items()) if value > 0]))
+        return growth
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
     def save(self, outputname):
         self._canvas.SaveAs(outputname)
         logger.info("Created %s" % outputname)
 
+    # saves the canvas as basename.<format> for all formats and returns the write time per format in seconds.
+    # The canvas is painted once into an image, from which all raster formats are written. Vector formats (pdf, eps, svg, ...)
+    # are written by SaveAs, which paints the canvas for each of them.
+    def save_all(self, basename, formats=None):
+        if formats == None:
+            formats = ["png", "pdf"]
+        timings = {}
+        start = time.time()
+        self._canvas.Modified()
+        self._canvas.Update()
+        image = None
+        if len([extension for extension in formats if extension in _raster_formats]) > 0:
+            image = R.TImage.Create()
+            image.FromPad(self._canvas)
+        timings["paint"] = time.time() - start
+        for extension in formats:
+            outputname = "%s.%s" % (basename, extension)
+            start = time.time()
+            if image != None and extension in _raster_formats:
+                image.WriteImage(outputname)
+            else:
+                self._canvas.SaveAs(outputname)
+            timings[extension] = time.time() - start
+            logger.info("Created %s" % outputname)
+        return timings
+
     def DrawChannelCategoryLabel(self, text, textsize=0.04, begin_left=None, print_inside=False):
         if print_inside:
             latex2 = R.TLatex()
@@ -145,8 +307,14 @@ class Plot(object):
         latex2.DrawLatex(x, y, text)
 
     def add_hist(self, hist, name, group_name="invisible"):
-        for subplot in self._subplots:
-            subplot.add_hist(hist=hist, name=name, group_name=group_name)
+        if self._share_hists:
+            shared = SharedHist(hist, len(self._subplots), self._clone_stats)
+            for subplot in self._subplots:
+                subplot.add_hist(hist=shared, name=name, group_name=group_name)
+            self._clone_stats["avoided"] += len(self._subplots) - 1
+        else:
+            for subplot in self._subplots:
+                subplot.add_hist(hist=hist, name=name, group_name=group_name)
 
     def add_graph(self, graph, name, group_name="invisible"):
         for subplot in self._subplots:
@@ -196,13 +364,25 @@ class Plot(object):
                 linewidth=linewidth,
                 markersize=markersize,
                 fillstyle=fillstyle,
-                alpha=alpha)
+                alpha=alpha,
+                shared=True)
 
     def create_stack(self, hist_names, name, group_name="invisible"):
         for subplot in self._subplots:
             subplot.create_stack(
                 hist_names=hist_names, name=name, group_name=group_name)
 
+    # compares histograms of the source subplot and registers the result in the target subplot, see Subplot.add_ratio
+    def add_ratio(self, name, numerator_names, denominator_names, mode="ratio", errors="numerator", group_name="invisible", source=0, target=1):
+        self.subplot(source).add_ratio(
+            name,
+            numerator_names,
+            denominator_names,
+            mode=mode,
+            errors=errors,
+            group_name=group_name,
+            target=self.subplot(target))
+
     def scaleXLabelSize(self, val):
         for subplot in self._subplots:
             subplot.scaleXLabelSize(val)
@@ -250,7 +430,7 @@ class Plot(object):
     def unroll(self, ur_bin_labels, ur_label_pos = 9, ur_label_angle = 270, ur_label_size = 1.0, selection = None, pads_to_print_labels = None):
         empty_labels = ["" for label in ur_bin_labels]
         for i, subplot in enumerate(self._subplots):
-            subplot.unroll(ur_bin_labels if (pads_to_print_labels == None or i in pads_to_print_labels) else empty_labels,
+            subplot.unroll(ur_bin_labels if (pads_to_print_labels is None or i in pads_to_print_labels) else empty_labels,
                            ur_label_pos, ur_label_angle, ur_label_size, selection)
 
     def changeXLabels(self, replacement_list): #requires list of strings with one string per labeled tick
@@ -288,6 +468,10 @@ class Subplot(object):
 
         self._hists = {}
         self._graphs= {}
+        # names of the registered histograms and stacks per group name in the order of registration
+        self._groups = {}
+        # cached sums of the groups, dropped as soon as a member is added or modified, see peek_hist
+        self._group_sums = {}
         self._xlabel = None
         self._ylabel = None
         self._logx = False
@@ -314,6 +498,7 @@ class Subplot(object):
         self._unroll_label_angle = 270
         self._unroll_label_scalesize = 1.0
         self._scale_ticklength = 1.0
+        self._frame = None
 
     @property
     def hists(self):
@@ -324,18 +509,61 @@ class Subplot(object):
         return self._graphs
 
     # adds histogram to subplot and assign individual name and group name. Default group name = "invisible" which is ignored by DrawAll function.
+    # A SharedHist is referenced instead of copied. Histograms given as hist_arrays.ArrayHist are processed as arrays and converted to TH1 when drawn.
     def add_hist(self, hist, name, group_name="invisible"):
         if name in self._hists.keys():
             logger.fatal("Histogram name %s already used!")
             raise Exception
-        if not (isinstance(hist, R.TH1D) or isinstance(hist, R.TH1F)):
+        shared = None
+        if isinstance(hist, SharedHist):
+            shared = hist
+            hist = shared.hist
+        if not (isinstance(hist, R.TH1D) or isinstance(hist, R.TH1F) or isinstance(hist, hist_arrays.ArrayHist)):
             logger.fatal(
                 "add_hist expects a TH1F with name {}, got object {}".format(
                     name, hist))
             raise Exception
-        self._hists[name] = [
-            copy.deepcopy(hist), group_name, ""
-        ]  # last entry is used to save the markerstyle and set in a different function
+        self._register(
+            name,
+            HistEntry(hist if shared != None else copy.deepcopy(hist),
+                      group_name, "", shared))
+
+    def _register(self, name, entry):
+        self._hists[name] = entry
+        self._groups.setdefault(entry.group, []).append(name)
+        self._modified(entry)
+
+    # invalidates the cached sum of the group of an entry, has to be called whenever a histogram of the subplot is changed
+    def _modified(self, entry):
+        self._group_sums.pop(entry.group, None)
+
+    # returns the entries of all histograms and stacks in the given group
+    def _group_entries(self, group_name):
+        return [self._hists[name] for name in self._groups.get(group_name, [])]
+
+    # makes the histogram of an entry private to this subplot before it is modified, see SharedHist
+    def _unshare(self, entry):
+        shared = entry.shared
+        if shared == None:
+            return
+        entry.shared = None
+        shared.owners -= 1
+        if shared.owners == 0:  # last owner keeps the shared copy
+            return
+        entry.hist = copy.deepcopy(shared.hist)
+        shared.stats["avoided"] -= 1
+        shared.stats["cloned"] += 1
+        # stacks of this subplot have to contain the private copy as well
+        for other in self._hists.values():
+            if isinstance(other.hist, hist_arrays.ArrayStack):
+                other.hist.replace(shared.hist, entry.hist)
+            elif isinstance(other.hist, R.THStack):
+                members = other.hist.GetHists()
+                index = members.IndexOf(_root_object(shared.hist))
+                if index >= 0:
+                    members.RemoveAt(index)
+                    members.AddAt(_root_object(entry.hist), index)
+                    other.hist.Modified()
 
     def add_graph(self, graph, name, group_name="invisible"):
         if name in self._graphs.keys():
@@ -346,39 +574,44 @@ class Subplot(object):
                 "add_graph expects a TGraph with name {}, got object {}".format(
                     name, graph))
             raise Exception
-        self._graphs[name] = [
-            copy.deepcopy(graph), group_name, ""
-        ]  # last entry is used to save the markerstyle and set in a different function
+        self._graphs[name] = HistEntry(copy.deepcopy(graph), group_name)
 
-    # returns histogram with given name or sum of histograms with given group name
+    # returns histogram with given name or a copy of the sum of histograms with given group name. Both may be modified by the caller.
     def get_hist(self, name):
+        if name in self._hists.keys() and not _is_stack(self._hists[name].hist):
+            entry = self._hists[name]
+            self._unshare(entry)
+            self._modified(entry)
+            return entry.hist
+        return copy.deepcopy(self.peek_hist(name))
+
+    # same as get_hist, but returns the registered histogram or the cached group sum itself, which must not be modified.
+    # A single histogram may still be shared with other subplots.
+    def peek_hist(self, name):
         if name in self._hists.keys():
-            if isinstance(self._hists[name][0], R.THStack):
+            if _is_stack(self._hists[name].hist):
                 logger.fatal("get_hist does not accept names of stacks!")
                 raise Exception
-            return self._hists[name][0]
-        else:
-            
-            empty = True
-            for entry in self._hists.values():
-                print(entry)
-                if entry[1] == name:
-                    
-                    if isinstance(entry[0], R.THStack):
-                        logger.fatal(
-                            "get_hist does not accept names of stacks!")
-                        raise Exception
-                    if empty:
-                        hist = copy.deepcopy(entry[0])
-                        hist.SetName(name)
-                        empty = False
-                    else:
-                        hist.Add(entry[0])
-            if empty:
-                logger.fatal("No histograms matching to name %s" % name)
+            return self._hists[name].hist
+        if name in self._group_sums:
+            return self._group_sums[name]
+        empty = True
+        for entry in self._group_entries(name):
+            if _is_stack(entry.hist):
+                logger.fatal(
+                    "get_hist does not accept names of stacks!")
                 raise Exception
+            if empty:
+                hist = copy.deepcopy(entry.hist)
+                hist.SetName(name)
+                empty = False
             else:
-                return hist
+                _add(hist, entry.hist)
+        if empty:
+            logger.fatal("No histograms matching to name %s" % name)
+            raise Exception
+        self._group_sums[name] = hist
+        return hist
 
     def get_graph(self, name):
         if name in self._graphs.keys():
@@ -387,11 +620,11 @@ class Subplot(object):
     # draws all histograms assigned to the subplot except those with group name "invisible"
     def DrawAll(self):
         if isinstance(self._unroll, list):
-            self.DrawUnrolled([entry for entry in self._hists() if not self._hists[entry][1] == "invisible"])
+            self.DrawUnrolled([entry for entry in self._hists.keys() if not self._hists[entry].group == "invisible"])
         else:
             isFirst = True
             for hist in self._hists.values():
-                if not hist[1] == "invisible":
+                if not hist.group == "invisible":
                     self.DrawSingle(hist, isFirst)
                     isFirst = False
             R.gPad.RedrawAxis()
@@ -401,54 +634,97 @@ class Subplot(object):
         if isinstance(self._unroll, list):
             self.DrawUnrolled(names)
         else:
-            if isinstance(names, basestring):
-                names = [names]
             isFirst = True
-            for name in names:
-                if name in self._hists.keys():
-                    self.DrawSingle(self._hists[name], isFirst)
-                    isFirst = False
-                elif name in self._graphs.keys():
-                    self.DrawSingle(self._graphs[name], isFirst)
-                    isFirst = False
-                else:
-                    for entry in self._hists.values():
-                        if entry[1] == name:
-                            self.DrawSingle(entry, isFirst)
-                            isFirst = False
+            for entry in self._draw_entries(names):
+                self.DrawSingle(entry, isFirst)
+                isFirst = False
             R.gPad.RedrawAxis()
 
+    # returns the entries selected via a list of individual names and/or group names in drawing order
+    def _draw_entries(self, names):
+        if isinstance(names, basestring):
+            names = [names]
+        entries = []
+        for name in names:
+            if name in self._hists.keys():
+                entries.append(self._hists[name])
+            elif name in self._graphs.keys():
+                entries.append(self._graphs[name])
+            else:
+                entries.extend(self._group_entries(name))
+        return entries
+
     # draws single ROOT histogram. If isFirst is True, formatting is applied and histogram overwrites existing drawings, else it is added
     def DrawSingle(self, hist, isFirst):
         self._pad.cd()
         if isFirst:
-            #hist[0].Draw() # needed for stacks
+            # the axis style of the first histogram is specific to this subplot
+            self._unshare(hist)
+            root_hist = _root_object(hist.hist)
+            #root_hist.Draw() # needed for stacks
             if self._ylims != None and isinstance(
-                    hist[0], R.THStack
+                    root_hist, R.THStack
             ):  # otherwise lims are not set without a unintended margin
-                copystack = copy.deepcopy(hist[0])
-                axishist = copystack.GetHists()[0]
+                axishist = copy.deepcopy(root_hist.GetHists()[0])
+                self._frame = axishist
                 self.setAxisStyles(axishist)
-                axishist.Draw(hist[2])
-                hist[0].Draw(hist[2] + "SAME")
+                axishist.Draw(hist.style)
+                root_hist.Draw(hist.style + "SAME")
             else:
-                hist[0].Draw()  # needed for stacks
-                self.setAxisStyles(hist[0])
-                hist[0].Draw(hist[2])
+                root_hist.Draw()  # needed for stacks
+                self.setAxisStyles(root_hist)
+                root_hist.Draw(hist.style)
         else:
-            hist[0].Draw(hist[2] + "SAME")
+            _root_object(hist.hist).Draw(hist.style + "SAME")
+
+    # returns a view of the subplot drawing into its own pad, used for the pads of unrolled plots. Histograms, graphs and groups
+    # are shared with this subplot, while the pad and the axis settings are private to the view.
+    def _unroll_view(self, index):
+        view = copy.copy(self)
+        self._pad.GetMother().cd()
+        view._pad = R.TPad("%s_unrolled_%i" % (self._pad.GetName(), index),
+                           "%s_unrolled_%i" % (self._pad.GetName(), index),
+                           0., 0., 1., 1.)
+        view._pad.SetBottomMargin(self._pad.GetBottomMargin())
+        view._pad.SetTopMargin(self._pad.GetTopMargin())
+        view._pad.SetFillStyle(4000)
+        for attribute in ["_xlims", "_ylims", "_nxdivisions", "_nydivisions",
+                          "_changexlabels", "_changeylabels"]:
+            if getattr(self, attribute) != None:
+                setattr(view, attribute, list(getattr(self, attribute)))
+        view._unroll_pads = []
+        view._frame = None
+        return view
+
+    # draws the selected histograms into the pad of an unrolled view. Since the histograms are shared by all views,
+    # the axis range and style of the pad are carried by a private frame histogram and the histograms are drawn on top of it.
+    def _DrawView(self, names):
+        self._pad.cd()
+        entries = self._draw_entries(names)
+        frame = entries[0].hist
+        if _is_stack(frame):
+            frame = frame.GetHists()[0]
+        self._frame = copy.deepcopy(_root_object(frame))
+        self.setAxisStyles(self._frame)
+        self._frame.Draw("AXIS")
+        for entry in entries:
+            _root_object(entry.hist).Draw(entry.style + "SAME")
+        R.gPad.RedrawAxis()
 
     def DrawUnrolled(self, names):
         if not isinstance(self._unroll, list):
             logger.fatal("A list of bin labels must be given for unrolling!")
             raise Exception
+        if isinstance(names, basestring):
+            names = [names]
         n_bins = len(self._unroll)
         n_selected_bins = len(self._selection)
         #determine ranges
         if self._xlims == None:
-            hist = self._hists[names[0]][0]
-            if isinstance(hist, R.THStack):
+            hist = self._hists[names[0]].hist
+            if _is_stack(hist):
                 hist = hist.GetHists()[0]
+            hist = _root_object(hist)
             self._xlims = [hist.GetXaxis().GetXmin(), hist.GetXaxis().GetXmax()]
         axis_borders = [self._xlims[0]]
         pad_borders = [self._pad.GetLeftMargin()]
@@ -460,11 +736,19 @@ class Subplot(object):
             pad_borders.append(self._pad.GetLeftMargin() + (1.0 - self._pad.GetRightMargin() - self._pad.GetLeftMargin()) / n_selected_bins * (i + 1))
         #fix ticklengths
         self._scale_ticklength = 2.0 / n_bins
-        #create subpads
-        copy_me = copy.deepcopy(self)
+        #determine common y range
+        if self._ylims == None:
+            hist = self._hists[names[0]].hist
+            if _is_stack(hist):
+                hist = hist.GetHists()[0]
+            hist = _root_object(hist)
+            ylims = [hist.GetMinimum()/1.1, hist.GetMaximum()*1.2]
+            if self._logy and ylims[0] == 0.0:
+                ylims[0] = ylims[1]/10.0
+        #create subpads as views sharing the histograms of this subplot
         margin = 0.01 * axisrange / n_bins
         for i, idx in enumerate(self._selection):
-            self._unroll_pads.append(copy.deepcopy(copy_me))
+            self._unroll_pads.append(self._unroll_view(i))
             self._unroll_pads[i]._unroll = self._unroll[idx]
             self._unroll_pads[i]._xlims = [axis_borders[idx] + margin, axis_borders[idx+1] - margin]
             self._unroll_pads[i]._pad.SetLeftMargin(pad_borders[i])
@@ -485,19 +769,11 @@ class Subplot(object):
                                                        "{:.1f}".format(offs + 2 * incr),
                                                        "{:.1f}".format(offs + 3 * incr),
                                                        " "]
-                
-            #fix y range
             if self._ylims == None:
-                hist = self._hists[names[0]][0]
-                if isinstance(hist, R.THStack):
-                    copystack = copy.deepcopy(hist)
-                    hist = copystack.GetHists()[0]
-                self._unroll_pads[i]._ylims = [hist.GetMinimum()/1.1, hist.GetMaximum()*1.2]
-                if self._logy and self._unroll_pads[i]._ylims[0] == 0.0:
-                    self._unroll_pads[i]._ylims[0] = self._unroll_pads[i]._ylims[1]/10.0
+                self._unroll_pads[i]._ylims = list(ylims)
         #draw subpads
         for unroll_pad in self._unroll_pads:
-            unroll_pad.Draw(names)
+            unroll_pad._DrawView(names)
             styles.DrawText(unroll_pad._pad, unroll_pad._unroll, unroll_pad._unroll_label_scalesize, self._unroll_label_pos, self._unroll_label_angle)
 
     def setXlabel(self, label):
@@ -630,7 +906,8 @@ class Subplot(object):
         if self._grid:
             self._pad.SetGridy(1)
 
-    # sets style for specific histogram or group
+    # sets style for specific histogram or group. With shared=True the same style is applied by all subplots
+    # sharing the histogram (as done by Plot.setGraphStyle), so it does not have to be cloned.
     def setGraphStyle(self,
                       name,
                       markerstyle,
@@ -642,77 +919,90 @@ class Subplot(object):
                       markersize=1,
                       linestyle=1,
                       fillstyle=1001,
-                      alpha=1.0):
+                      alpha=1.0,
+                      shared=False):
         markerstyledict = {}
         if markerstyle in markerstyledict.keys():
             markerstyle = markerstyledict[markerstyle]
         if name in self._hists.keys():
-            if isinstance(self._hists[name][0], R.THStack):
+            if _is_stack(self._hists[name].hist):
                 logger.warning(
                     "Adressed object is stack. Style cannot be set!")
                 return
-            self._hists[name][2] = markerstyle
-            self._hists[name][0].SetMarkerStyle(markershape)
-            self._hists[name][0].SetMarkerColor(markercolor)
-            self._hists[name][0].SetLineColor(linecolor)
-            self._hists[name][0].SetFillColor(fillcolor)
-            self._hists[name][0].SetLineWidth(linewidth)
-            self._hists[name][0].SetMarkerSize(markersize)
-            self._hists[name][0].SetLineStyle(linestyle)
-            self._hists[name][0].SetFillStyle(fillstyle)
+            if not shared:
+                self._unshare(self._hists[name])
+            self._modified(self._hists[name])
+            self._hists[name].style = markerstyle
+            self._hists[name].hist.SetMarkerStyle(markershape)
+            self._hists[name].hist.SetMarkerColor(markercolor)
+            self._hists[name].hist.SetLineColor(linecolor)
+            self._hists[name].hist.SetFillColor(fillcolor)
+            self._hists[name].hist.SetLineWidth(linewidth)
+            self._hists[name].hist.SetMarkerSize(markersize)
+            self._hists[name].hist.SetLineStyle(linestyle)
+            self._hists[name].hist.SetFillStyle(fillstyle)
         elif name in self._graphs.keys():
-            self._graphs[name][2] = markerstyle
-            self._graphs[name][0].SetMarkerStyle(markershape)
-            self._graphs[name][0].SetMarkerColor(markercolor)
-            self._graphs[name][0].SetLineColor(linecolor)
-            self._graphs[name][0].SetFillColorAlpha(fillcolor,alpha)
-            self._graphs[name][0].SetLineWidth(linewidth)
-            self._graphs[name][0].SetMarkerSize(markersize)
-            self._graphs[name][0].SetLineStyle(linestyle)
-            self._graphs[name][0].SetFillStyle(fillstyle)
+            self._graphs[name].style = markerstyle
+            self._graphs[name].hist.SetMarkerStyle(markershape)
+            self._graphs[name].hist.SetMarkerColor(markercolor)
+            self._graphs[name].hist.SetLineColor(linecolor)
+            # transparent colors are reused instead of adding a new color to ROOT for each call
+            self._graphs[name].hist.SetFillColor(fillcolor if alpha >= 1.0 else styles.CreateTransparentColor(fillcolor, alpha))
+            self._graphs[name].hist.SetLineWidth(linewidth)
+            self._graphs[name].hist.SetMarkerSize(markersize)
+            self._graphs[name].hist.SetLineStyle(linestyle)
+            self._graphs[name].hist.SetFillStyle(fillstyle)
         else:
-            for hist in self._hists.values():
-                if hist[1] == name:
-                    if isinstance(hist[0], R.THStack):
-                        logger.warning(
-                            "Adressed object is stack. Style cannot be set!")
-                        return
-                    hist[2] = markerstyle
-                    hist[0].SetMarkerStyle(markershape)
-                    hist[0].SetMarkerColor(markercolor)
-                    hist[0].SetLineColor(linecolor)
-                    hist[0].SetFillColor(fillcolor)
-                    hist[0].SetLineWidth(linewidth)
-                    hist[0].SetMarkerSize(markersize)
-                    hist[0].SetLineStyle(linestyle)
-                    hist[0].SetFillStyle(fillstyle)
+            for hist in self._group_entries(name):
+                if _is_stack(hist.hist):
+                    logger.warning(
+                        "Adressed object is stack. Style cannot be set!")
+                    return
+                if not shared:
+                    self._unshare(hist)
+                self._modified(hist)
+                hist.style = markerstyle
+                hist.hist.SetMarkerStyle(markershape)
+                hist.hist.SetMarkerColor(markercolor)
+                hist.hist.SetLineColor(linecolor)
+                hist.hist.SetFillColor(fillcolor)
+                hist.hist.SetLineWidth(linewidth)
+                hist.hist.SetMarkerSize(markersize)
+                hist.hist.SetLineStyle(linestyle)
+                hist.hist.SetFillStyle(fillstyle)
 
     # creates stack from registered histograms defined via name or group name
     def create_stack(self, hist_names, name, group_name="invisible"):
         if name in self._hists.keys():
             logger.fatal("Stack name %s already used!" % name)
             raise Exception
-        stack = R.THStack("hs", "")
         # regularize inputs
         if isinstance(hist_names, basestring):
             hist_names = [hist_names]
+        members = []
         for hist_name in hist_names:
             if hist_name in self._hists.keys():
-                stack.Add(self._hists[hist_name][0])
+                members.append(self._hists[hist_name].hist)
                 logger.debug(
                     "Added histogram %s to stack %s" % (hist_name, name))
             else:
-                for key, hist in self._hists.iteritems():
-                    if hist_name == hist[1]:
-                        if isinstance(hist[0], R.THStack):
-                            logger.fatal(
-                                "Tried to import a stack into a stack, which is impossible!"
-                            )
-                            raise Exception
-                        stack.Add(hist[0])
-                        logger.debug(
-                            "Added histogram %s to stack %s" % (key, name))
-        self._hists[name] = [stack, group_name, "hist"]
+                for key in self._groups.get(hist_name, []):
+                    if _is_stack(self._hists[key].hist):
+                        logger.fatal(
+                            "Tried to import a stack into a stack, which is impossible!"
+                        )
+                        raise Exception
+                    members.append(self._hists[key].hist)
+                    logger.debug(
+                        "Added histogram %s to stack %s" % (key, name))
+        # stacks of histograms held as arrays are built when drawn
+        if len(members) > 0 and all([isinstance(member, hist_arrays.ArrayHist) for member in members]):
+            stack = hist_arrays.ArrayStack("hs")
+        else:
+            stack = R.THStack("hs", "")
+        for member in members:
+            stack.Add(member if isinstance(stack, hist_arrays.ArrayStack) else _root_object(member))
+        self._register(name, HistEntry(stack, group_name, "hist"))
 
     # normalizes one or more histograms to a given denominator
     def normalize(self, nominator_names, denominator_names):
@@ -726,10 +1016,10 @@ class Subplot(object):
         isFirst = True
         for name in denominator_names:
             if isFirst:
-                denominator = copy.deepcopy(self.get_hist(name))
+                denominator = copy.deepcopy(self.peek_hist(name))
                 isFirst = False
             else:
-                denominator.Add(self.get_hist(name))
+                _add(denominator, self.peek_hist(name))
         # do not propagate denominator errors
         for i in xrange(1, denominator.GetNbinsX() + 1):
             denominator.SetBinError(i, 0.)
@@ -737,28 +1027,112 @@ class Subplot(object):
         # normalize all nominator inputs
         for name in nominator_names:
             if name in self._hists.keys():
-                if isinstance(self._hists[name][0], R.THStack):
+                if _is_stack(self._hists[name].hist):
                     logger.fatal("Stacks cannot be normalized!")
                     raise Exception
-                self._hists[name][0].Divide(denominator)
+                self._unshare(self._hists[name])
+                self._modified(self._hists[name])
+                _divide(self._hists[name].hist, denominator)
+            else:
+                for hist in self._group_entries(name):
+                    if _is_stack(hist.hist):
+                        logger.fatal("Stacks cannot be normalized!")
+                        raise Exception
+                    self._unshare(hist)
+                    self._modified(hist)
+                    _divide(hist.hist, denominator)
+
+    # returns the sum of the histograms and groups given by name as read-only arrays of contents and squared weights, see peek_hist
+    def _sum_arrays(self, names):
+        if isinstance(names, basestring):
+            names = [names]
+        for i, name in enumerate(names):
+            hist = self.peek_hist(name)
+            hist_contents = hist_arrays.get_contents(hist)
+            hist_sumw2 = hist_arrays.get_sumw2(hist, hist_contents)
+            if i == 0:
+                template, contents, sumw2 = hist, hist_contents, hist_sumw2
             else:
-                for hist in self._hists.values():
-                    if hist[1] == name:
-                        if isinstance(hist[0], R.THStack):
-                            logger.fatal("Stacks cannot be normalized!")
-                            raise Exception
-                        hist[0].Divide(denominator)
-
-    # normalizes bin contents of all histograms in the subplot to their bin width
+                contents, sumw2 = contents + hist_contents, sumw2 + hist_sumw2
+        return template, contents, sumw2
+
+    # drops all ROOT objects of the subplot, its unrolled views and cached sums, see Plot.close
+    def close(self):
+        for view in self._unroll_pads:
+            # the histograms of a view are the ones of this subplot
+            _release(view._frame)
+            _release(view._pad)
+            view._frame = None
+            view._pad = None
+        self._unroll_pads = []
+        for entry in list(self._hists.values()) + list(self._graphs.values()):
+            if entry.shared != None:
+                _release(entry.shared.hist)
+            _release(entry.hist)
+        for hist in self._group_sums.values():
+            _release(hist)
+        _release(self._frame)
+        _release(self._pad)
+        self._hists = {}
+        self._graphs = {}
+        self._groups = {}
+        self._group_sums = {}
+        self._frame = None
+        self._pad = None
+
+    # returns edges, contents, upper and lower errors of a histogram or the sum of a group, e.g. to export yields, see hist_arrays.get_arrays
+    def get_arrays(self, name):
+        return hist_arrays.get_arrays(self.peek_hist(name))
+
+    # compares the sum of the numerator histograms and/or groups to the sum of the denominator histograms and/or groups, e.g. data or S+B
+    # to the total background, and registers the result as new histogram in this subplot or the given target subplot.
+    # mode is one of "ratio", "pull" and "significance" and errors one of "numerator", "both" and "none", see hist_arrays.compare.
+    def add_ratio(self, name, numerator_names, denominator_names, mode="ratio", errors="numerator", group_name="invisible", target=None):
+        if target == None:
+            target = self
+        if name in target._hists.keys():
+            logger.fatal("Histogram name %s already used!" % name)
+            raise Exception
+        template, contents_n, sumw2_n = self._sum_arrays(numerator_names)
+        denominator, contents_d, sumw2_d = self._sum_arrays(denominator_names)
+        if len(contents_n) != len(contents_d):
+            logger.fatal("Binnings of numerator and denominator of %s do not match!" % name)
+            raise Exception
+        contents, sumw2 = hist_arrays.compare(contents_n, sumw2_n, contents_d, sumw2_d, mode, errors)
+        hist = template.Clone(name)
+        hist.SetDirectory(0)
+        hist_arrays.set_sumw2(hist, sumw2)
+        hist_arrays.set_contents(hist, contents)
+        target._register(name, HistEntry(hist, group_name))
+
+    # normalizes bin contents and errors of all histograms in the subplot to their bin width, including histograms only contained in stacks
     def normalizeByBinWidth(self):
+        stacks = []
         for hist in self._hists.values():
-            if not isinstance(hist[0], R.THStack):
-                denominator = copy.deepcopy(hist[0])
-                for i in range(denominator.GetNbinsX()):
-                    denominator.SetBinContent(i + 1,
-                                              denominator.GetBinWidth(i + 1))
-                    denominator.SetBinError(i + 1, 0.0)
-                hist[0].Divide(denominator)
+            if _is_stack(hist.hist):
+                stacks.append(hist.hist)
+            else:
+                self._unshare(hist)
+                self._modified(hist)
+        # THStacks mixing TH1s and ArrayHists hold the TH1Ds of the ArrayHists, which are resolved to their ArrayHist,
+        # so that each histogram is scaled once and the TH1D stays in sync
+        owners = dict((_object_key(entry.hist.peek_th1()), entry.hist) for entry in self._hists.values()
+                      if isinstance(entry.hist, hist_arrays.ArrayHist) and entry.hist.peek_th1() != None)
+        # each histogram object is scaled once, also if it is contained in several stacks
+        scaled = set()
+        for hist in [entry.hist for entry in self._hists.values() if not _is_stack(entry.hist)] + \
+                [member for stack in stacks for member in stack.GetHists()]:
+            hist = owners.get(_object_key(hist), hist)
+            key = _object_key(hist)
+            if key in scaled:
+                continue
+            scaled.add(key)
+            widths = hist_arrays.get_bin_widths(hist)
+            contents = hist_arrays.get_contents(hist)
+            hist_arrays.set_sumw2(hist, hist_arrays.get_sumw2(hist, contents) / widths**2)
+            hist_arrays.set_contents(hist, contents / widths)
+        for stack in stacks:
+            stack.Modified()
 
 
     def unroll(self, ur_bin_labels, ur_label_pos = 9, ur_label_angle = 270, ur_label_size = 1.0, selection = None):
@@ -766,7 +1140,7 @@ class Subplot(object):
         self._unroll_label_pos = ur_label_pos
         self._unroll_label_angle = ur_label_angle
         self._unroll_label_scalesize = ur_label_size
-        if selection == None:
+        if selection is None:
             self._selection = range(len(self._unroll))
         else:
             self._selection = selection
@@ -805,6 +1179,12 @@ class Line(object):
         self._line.SetLineColor(self.color)
         self._line.Draw("same")
 
+    def close(self):
+        _release(self._line)
+        self._line = None
+        self.reference_subplot = None
+        self._subplots = []
+
 class Legend(object):
     def __init__(self, reference_subplot, width, height, pos, offset,
                  subplots):
@@ -846,6 +1226,7 @@ class Legend(object):
         self._ncolumns = 1
         self._FillColor = 0
         self._alpha = 1.0
+        self._entries = []
 
     def add_entry(self, subplot_index, histname, label, style):
         if not isinstance(subplot_index, int):
@@ -854,15 +1235,12 @@ class Legend(object):
         if subplot_index >= len(self._subplots):
             logger.fatal("Subplot index is out of range!")
             raise Exception
-        if histname in self._subplots[subplot_index]._hists.keys():
-            self._legend.AddEntry(
-                self._subplots[subplot_index]._hists[histname][0], label, style)
-        elif histname in self._subplots[subplot_index]._graphs.keys():
-            self._legend.AddEntry(
-                self._subplots[subplot_index]._graphs[histname][0], label, style)
-        else:
+        if not (histname in self._subplots[subplot_index]._hists.keys() or
+                histname in self._subplots[subplot_index]._graphs.keys()):
             logger.fatal("Requested histogram for legend does not exist!")
             raise Exception
+        # the objects are looked up when drawing, shared histograms may have been cloned in the meantime
+        self._entries.append([subplot_index, histname, label, style])
 
     def scaleTextSize(self, scale):
         self._textsizescale = scale
@@ -877,8 +1255,31 @@ class Legend(object):
         self._alpha = val
 
     def Draw(self):
+        for subplot_index, histname, label, style in self._entries:
+            if histname in self._subplots[subplot_index]._hists.keys():
+                self._legend.AddEntry(
+                    _root_object(self._subplots[subplot_index]._hists[histname].hist), label, style)
+            else:
+                self._legend.AddEntry(
+                    self._subplots[subplot_index]._graphs[histname].hist, label, style)
+        self._entries = []
         self._legend.SetTextFont(42)
         self._legend.SetTextSize(0.025 * self._textsizescale)
-        self._legend.SetFillColorAlpha(self._FillColor, self._alpha)
+        self._legend.SetFillColor(self._FillColor if self._alpha >= 1.0 else styles.CreateTransparentColor(self._FillColor, self._alpha))
         self._legend.SetColumnSeparation(0)
         self._legend.Draw("same")
+
+    def close(self):
+        _release(self._legend)
+        self._legend = None
+        self._entries = []
+        self._subplots = []
+
+
+# opt-in instrumentation, see profiling.py
+profiling.instrument_plot(Plot)
+profiling.instrument(Plot, ["add_hist", "create_stack", "setGraphStyle", "add_ratio", "DrawCMS", "DrawLumi", "DrawChannelCategoryLabel"])
+profiling.instrument(Subplot, ["add_hist", "get_hist", "peek_hist", "Draw", "DrawSingle", "DrawUnrolled", "setAxisStyles", "setGraphStyle",
+                               "create_stack", "normalize", "normalizeByBinWidth", "add_ratio"])
+profiling.instrument(Legend, ["add_entry", "Draw"])
+profiling.count_deepcopies(sys.modules[__name__])
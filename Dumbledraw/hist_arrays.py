@@ -0,0 +1,411 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import logging
+import numpy as np
+logger = logging.getLogger(__name__)
+
+# numpy types of the internal bin content arrays of the ROOT histogram classes
+_content_dtypes = {
+    "TH1F": np.float32,
+    "TH1D": np.float64,
+    "TH1I": np.int32,
+    "TH1S": np.int16,
+    "TH1C": np.int8,
+    "TH2F": np.float32,
+    "TH2D": np.float64,
+    "TH2I": np.int32,
+    "TH2S": np.int16,
+    "TH2C": np.int8,
+}
+
+
+# makes a raw C array returned by PyROOT readable as buffer of given length
+def _sized_buffer(pointer, size):
+    if hasattr(pointer, "SetSize"):  # PyROOT before ROOT 6.22
+        pointer.SetSize(size)
+    elif hasattr(pointer, "reshape"):  # cppyy low level view
+        reshaped = pointer.reshape((size, ))
+        if reshaped is not None:
+            pointer = reshaped
+    return pointer
+
+
+def _read_array(pointer, size, dtype):
+    if size == 0:
+        return np.zeros(0, dtype=np.float64)
+    return np.array(
+        np.frombuffer(_sized_buffer(pointer, size), dtype=dtype, count=size),
+        dtype=np.float64)
+
+
+# returns the bin edges of the x (or y) axis as float64 array of length nbins + 1
+def get_edges(hist, axis_name="x"):
+    if isinstance(hist, ArrayHist):
+        return hist.edges.copy()
+    axis = hist.GetYaxis() if axis_name == "y" else hist.GetXaxis()
+    nbins = axis.GetNbins()
+    xbins = axis.GetXbins()
+    if xbins.GetSize() == nbins + 1:  # variable binning
+        return _read_array(xbins.GetArray(), nbins + 1, np.float64)
+    return np.linspace(axis.GetXmin(), axis.GetXmax(), nbins + 1)
+
+
+# returns the bin contents of all cells including under- and overflow bins
+def get_contents(hist):
+    if isinstance(hist, ArrayHist):
+        return hist.contents.copy()
+    classname = hist.ClassName()
+    if not classname in _content_dtypes:
+        logger.fatal("Cannot read bin contents of histogram class %s!" %
+                     classname)
+        raise Exception
+    return _read_array(hist.GetArray(), hist.GetNcells(),
+                       _content_dtypes[classname])
+
+
+# returns the sum of squared weights of all cells including under- and overflow bins
+def get_sumw2(hist, contents=None):
+    if isinstance(hist, ArrayHist):
+        return hist.sumw2.copy()
+    sumw2 = hist.GetSumw2()
+    if sumw2.GetSize() == hist.GetNcells():
+        return _read_array(sumw2.GetArray(), sumw2.GetSize(), np.float64)
+    # without stored weights ROOT uses the bin content as variance
+    if contents is None:
+        contents = get_contents(hist)
+    return np.abs(contents)
+
+
+# returns edges, contents, upper and lower errors of the bins of a one dimensional histogram as float64 arrays (no under- and overflow)
+def get_arrays(hist):
+    edges = get_edges(hist)
+    contents = get_contents(hist)
+    if isinstance(hist, ArrayHist) or hist.GetBinErrorOption() == hist.kNormal:
+        errors = np.sqrt(get_sumw2(hist, contents))[1:-1]
+        return edges, contents[1:-1], errors, errors.copy()
+    # asymmetric (e.g. Poisson) errors are not stored in the histogram and have to be computed by ROOT
+    nbins = hist.GetNbinsX()
+    err_up = np.array([hist.GetBinErrorUp(i + 1) for i in range(nbins)],
+                      dtype=np.float64)
+    err_down = np.array([hist.GetBinErrorLow(i + 1) for i in range(nbins)],
+                        dtype=np.float64)
+    return edges, contents[1:-1], err_up, err_down
+
+
+# returns the sha1 of bin edges, contents and squared weights, e.g. to detect changed inputs
+def cells_hash(edges, contents, sumw2):
+    digest = hashlib.sha1()
+    for values in [edges, contents, sumw2]:
+        digest.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+# returns the cells_hash of a histogram, or None for a missing histogram
+def content_hash(hist):
+    if not hist:
+        return None
+    contents = get_contents(hist)
+    return cells_hash(get_edges(hist), contents, get_sumw2(hist, contents))
+
+
+# cache of the bin width factors per distinct binning, see get_bin_widths
+_bin_widths = {}
+
+
+# returns the bin widths of the x axis including under- and overflow cells, which are set to 1. Identical binnings share the same (read-only) array.
+def get_bin_widths(hist):
+    edges = get_edges(hist)
+    key = hashlib.sha1(edges.tobytes()).hexdigest()
+    if not key in _bin_widths:
+        widths = np.ones(len(edges) + 1, dtype=np.float64)
+        widths[1:-1] = np.diff(edges)
+        widths.setflags(write=False)
+        _bin_widths[key] = widths
+    return _bin_widths[key]
+
+
+# overwrites the bin contents of all cells including under- and overflow bins, keeping the number of entries
+def set_contents(hist, contents):
+    if isinstance(hist, ArrayHist):
+        hist.contents = np.array(contents, dtype=np.float64)
+        hist._modified()
+        return
+    entries = hist.GetEntries()
+    hist.SetContent(np.ascontiguousarray(contents, dtype=np.float64))
+    hist.SetEntries(entries)
+
+
+# overwrites the sum of squared weights of all cells including under- and overflow bins
+def set_sumw2(hist, sumw2):
+    if isinstance(hist, ArrayHist):
+        hist.sumw2 = np.array(sumw2, dtype=np.float64)
+        hist._modified()
+        return
+    if hist.GetSumw2N() == 0:
+        hist.Sumw2()
+    hist.GetSumw2().Set(len(sumw2), np.ascontiguousarray(sumw2, dtype=np.float64))
+
+
+# error propagation options of compare
+_compare_errors = ["numerator", "denominator", "both", "none"]
+
+
+# compares numerator and denominator cells (contents and squared weights) and returns the resulting contents and squared weights:
+#   mode "ratio":        n / d, errors of the numerator only (as Subplot.normalize), of the denominator only, of both uncorrelated or none
+#   mode "pull":         (n - d) / sigma with sigma of the numerator (also for errors "none"), of the denominator or of both, the resulting errors are zero
+#   mode "significance": n / sqrt(d) or n / sqrt(d + sigma_d^2) with errors "denominator" or "both", the resulting errors are zero
+# Cells with vanishing denominator or vanishing sigma are set to zero.
+def compare(contents_n, sumw2_n, contents_d, sumw2_d, mode="ratio", errors="numerator"):
+    if not errors in _compare_errors:
+        logger.fatal("Error propagation %s is not one of %s!" % (errors, ", ".join(_compare_errors)))
+        raise Exception
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if mode == "ratio":
+            valid = contents_d != 0.
+            result = np.where(valid, contents_n / contents_d, 0.)
+            if errors == "numerator":
+                result_sumw2 = np.where(valid, sumw2_n / contents_d**2, 0.)
+            elif errors == "denominator":
+                result_sumw2 = np.where(valid, result**2 * sumw2_d / contents_d**2, 0.)
+            elif errors == "both":
+                result_sumw2 = np.where(valid, (sumw2_n + result**2 * sumw2_d) / contents_d**2, 0.)
+            else:
+                result_sumw2 = np.zeros_like(result)
+        elif mode == "pull":
+            if errors == "both":
+                variance = sumw2_n + sumw2_d
+            elif errors == "denominator":
+                variance = sumw2_d
+            else:
+                variance = sumw2_n
+            valid = variance > 0.
+            result = np.where(valid, (contents_n - contents_d) / np.sqrt(variance), 0.)
+            result_sumw2 = np.zeros_like(result)
+        elif mode == "significance":
+            variance = contents_d + sumw2_d if errors in ["denominator", "both"] else contents_d
+            valid = variance > 0.
+            result = np.where(valid, contents_n / np.sqrt(variance), 0.)
+            result_sumw2 = np.zeros_like(result)
+        else:
+            logger.fatal("Unknown comparison mode %s!" % mode)
+            raise Exception
+    return result, result_sumw2
+
+
+# style methods of TH1 which are recorded by ArrayHist and applied when the TH1 is created
+_style_methods = [
+    "SetMarkerStyle", "SetMarkerColor", "SetMarkerSize", "SetLineColor",
+    "SetLineWidth", "SetLineStyle", "SetFillColor", "SetFillStyle",
+    "SetFillColorAlpha"
+]
+
+
+# One dimensional histogram held as NumPy arrays, which can be registered, summed, stacked and normalized by Subplot without ROOT.
+# It implements the subset of the TH1 interface used by Subplot. The TH1D is only created when the histogram is drawn, see th1.
+# contents and sumw2 include under- and overflow cells.
+class ArrayHist(object):
+    __slots__ = ["_name", "_title", "edges", "contents", "sumw2", "_style", "_th1"]
+
+    def __init__(self, name, edges, contents, sumw2=None, title=""):
+        self._name = name
+        self._title = title
+        self.edges = np.asarray(edges, dtype=np.float64)
+        contents = np.asarray(contents, dtype=np.float64)
+        if len(contents) == len(self.edges) - 1:  # without under- and overflow
+            contents = np.concatenate([[0.], contents, [0.]])
+        if len(contents) != len(self.edges) + 1:
+            logger.fatal("Histogram %s has %i edges but %i contents!" %
+                         (name, len(self.edges), len(contents)))
+            raise Exception
+        self.contents = contents
+        if sumw2 is None:
+            self.sumw2 = np.abs(contents)
+        else:
+            sumw2 = np.asarray(sumw2, dtype=np.float64)
+            if len(sumw2) == len(self.edges) - 1:
+                sumw2 = np.concatenate([[0.], sumw2, [0.]])
+            self.sumw2 = sumw2
+        # (method, args) of the style setters in the order of the calls, e.g. SetFillColorAlpha after SetFillColor
+        self._style = []
+        self._th1 = None
+
+    # reads a one dimensional ROOT histogram
+    @classmethod
+    def from_hist(cls, hist, name=None):
+        contents = get_contents(hist)
+        return cls(hist.GetName() if name == None else name,
+                   get_edges(hist), contents, get_sumw2(hist, contents),
+                   hist.GetTitle())
+
+    def __deepcopy__(self, memo):
+        copied = ArrayHist(self._name, self.edges, self.contents.copy(),
+                           self.sumw2.copy(), self._title)
+        copied._style = list(self._style)
+        return copied
+
+    # updates an existing TH1D in place, so that stacks and pads holding it draw the current contents
+    def _modified(self):
+        if self._th1 != None:
+            self._th1.SetNameTitle(self._name, self._title)
+            set_sumw2(self._th1, self.sumw2)
+            set_contents(self._th1, self.contents)
+
+    def GetName(self):
+        return self._name
+
+    def SetName(self, name):
+        self._name = name
+        self._modified()
+
+    def GetTitle(self):
+        return self._title
+
+    def SetTitle(self, title):
+        self._title = title
+        self._modified()
+
+    def ClassName(self):
+        return "ArrayHist"
+
+    def SetDirectory(self, directory):
+        pass
+
+    def GetNbinsX(self):
+        return len(self.edges) - 1
+
+    def GetBinContent(self, i):
+        return self.contents[i]
+
+    def SetBinContent(self, i, value):
+        self.contents[i] = value
+        self._modified()
+
+    def GetBinError(self, i):
+        return np.sqrt(self.sumw2[i])
+
+    def SetBinError(self, i, error):
+        self.sumw2[i] = error**2
+        self._modified()
+
+    def GetMinimum(self):
+        return self.contents[1:-1].min()
+
+    def GetMaximum(self):
+        return self.contents[1:-1].max()
+
+    def Integral(self):
+        return self.contents[1:-1].sum()
+
+    def Clone(self, name=None):
+        copied = self.__deepcopy__({})
+        if name != None:
+            copied._name = name
+        return copied
+
+    # adds a TH1 or ArrayHist with the same binning
+    def Add(self, hist, scale=1.):
+        contents = get_contents(hist)
+        self.sumw2 = self.sumw2 + scale**2 * get_sumw2(hist, contents)
+        self.contents = self.contents + scale * contents
+        self._modified()
+
+    # divides by a TH1 or ArrayHist with the same binning, propagating the errors of both as TH1.Divide
+    def Divide(self, hist):
+        contents = get_contents(hist)
+        self.contents, self.sumw2 = compare(self.contents, self.sumw2,
+                                            contents, get_sumw2(hist, contents),
+                                            "ratio", "both")
+        self._modified()
+
+    def Scale(self, factor):
+        self.contents = self.contents * factor
+        self.sumw2 = self.sumw2 * factor**2
+        self._modified()
+
+    # returns the TH1D with the contents and style of this histogram, which is created on first use and kept up to date afterwards
+    def th1(self):
+        if self._th1 == None:
+            import ROOT
+            hist = ROOT.TH1D(self._name, self._title, self.GetNbinsX(), self.edges)
+            hist.SetDirectory(0)
+            set_sumw2(hist, self.sumw2)
+            set_contents(hist, self.contents)
+            for method, args in self._style:
+                getattr(hist, method)(*args)
+            self._th1 = hist
+        return self._th1
+
+    def Draw(self, option=""):
+        self.th1().Draw(option)
+
+    # returns the TH1D if it has been created (e.g. as member of a THStack), without creating it
+    def peek_th1(self):
+        return self._th1
+
+    # drops the cached ROOT object and returns it, see Plot.close
+    def release(self):
+        th1 = self._th1
+        self._th1 = None
+        return th1
+
+
+def _style_setter(method):
+    def setter(self, *args):
+        self._style = [entry for entry in self._style if entry[0] != method] + [(method, args)]
+        if self._th1 != None:
+            getattr(self._th1, method)(*args)
+    return setter
+
+
+for _method in _style_methods:
+    setattr(ArrayHist, _method, _style_setter(_method))
+
+
+# stack of ArrayHists, which is converted to a THStack when drawn
+class ArrayStack(object):
+    __slots__ = ["_name", "_members", "_th1"]
+
+    def __init__(self, name):
+        self._name = name
+        self._members = []
+        self._th1 = None
+
+    def GetName(self):
+        return self._name
+
+    def Add(self, hist):
+        self._members.append(hist)
+        self._th1 = None
+
+    def GetHists(self):
+        return list(self._members)
+
+    # replaces a member, e.g. after it has been cloned by the subplot
+    def replace(self, old, new):
+        self._members = [new if member is old else member for member in self._members]
+        self._th1 = None
+
+    # the members update their TH1Ds in place, only the sum of the THStack has to be recomputed
+    def Modified(self):
+        if self._th1 != None:
+            self._th1.Modified()
+
+    def th1(self):
+        if self._th1 == None:
+            import ROOT
+            stack = ROOT.THStack(self._name, "")
+            for member in self._members:
+                stack.Add(member.th1())
+            self._th1 = stack
+        return self._th1
+
+    def Draw(self, option=""):
+        self.th1().Draw(option)
+
+    # drops the cached ROOT object and returns it, see Plot.close
+    def release(self):
+        th1 = self._th1
+        self._th1 = None
+        return th1
@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import logging
+import time
+import yaml
+logger = logging.getLogger(__name__)
+
+import dumbledraw
+import hist_arrays
+import styles
+import rootfile_parser
+import rootfile_parser_inputshapes
+
+# A plot spec is a plain dictionary (usually read from a YAML or JSON file) describing a complete plot, e.g.
+#
+# splits: [0.65, [0.47, 0.45]]         # panel splits as given to dumbledraw.Plot
+# style: ModTDR                        # optional, default "none" (e.g. if the style is set by the campaign runner)
+# style_kwargs: {r: 0.04, l: 0.14}
+# share_hists: true                    # optional, share histograms between the subplots, see dumbledraw.SharedHist
+# input: {file: shapes.root, parser: CombineHarvester}  # or parser: inputshapes with variable: ...
+# histograms:                          # arguments of the parser's get method, optional group and subplots (default all)
+#   - {name: ZTT, get: [Run2016, mt, qqh, ZTT], group: bkg, style: {markerstyle: hist, fillcolor: ZTT}}
+# sums:                                # sums of registered histograms or groups, e.g. for S+B
+#   - {subplot: 2, name: bkg_ggH, hists: [ggH, unc_band]}
+# normalize:
+#   - {subplot: 2, numerators: [unc_band, data_obs], denominators: unc_band}
+# stacks:
+#   - {name: stack, hists: [ZTT, ZL]}
+# ratios:                              # comparisons registered in the target subplot, see Subplot.add_ratio
+#   - {name: data_ratio, numerators: data_obs, denominators: bkg, mode: ratio, errors: numerator, source: 0, target: 2}
+# axes: {xtitlesize: 0.8}              # panel options applied to all subplots
+# panels:
+#   - {subplot: 0, ylims: [100, 2000], logy: true, ylabel: N_{events}, draw: [stack, data_obs]}
+# legends:
+#   - {width: 0.48, height: 0.15, ncolumns: 3, entries: [[0, ZTT, Z#rightarrow#tau#tau, f]]}
+# lines:
+#   - {reference_subplot: 2, xmin: 0., ymin: 1., xmax: 1., ymax: 1.}
+# labels: {cms: {variable: m_vis, channel: mt}, lumi: 35.9 fb^{-1} (13 TeV), channel_category: "#mu#tau_{h}, VBF"}
+# output: {name: testoutput, formats: [png, pdf]}
+#
+# Colors given as strings are taken from styles.color_dict.
+
+# maps the panel options of a spec to the Subplot methods
+_panel_options = {
+    "xlabel": "setXlabel",
+    "ylabel": "setYlabel",
+    "xlims": "setXlims",
+    "ylims": "setYlims",
+    "logx": "setLogX",
+    "logy": "setLogY",
+    "grid": "setGrid",
+    "nxdivisions": "setNXdivisions",
+    "nydivisions": "setNYdivisions",
+    "xlabelsize": "scaleXLabelSize",
+    "ylabelsize": "scaleYLabelSize",
+    "xtitlesize": "scaleXTitleSize",
+    "ytitlesize": "scaleYTitleSize",
+    "xtitleoffset": "scaleXTitleOffset",
+    "ytitleoffset": "scaleYTitleOffset",
+    "xlabeloffset": "scaleXLabelOffset",
+    "ylabeloffset": "scaleYLabelOffset",
+    "xlabels": "changeXLabels",
+    "ylabels": "changeYLabels",
+}
+
+_color_options = ["markercolor", "linecolor", "fillcolor"]
+
+_default_formats = ["png", "pdf"]
+
+
+def load_spec(path):
+    with open(path) as specfile:
+        if path.endswith(".json"):
+            return json.load(specfile)
+        return yaml.safe_load(specfile)
+
+
+# returns a hash identifying the spec, which is independent of the ordering of the dictionaries
+def spec_hash(spec):
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def open_input(input_spec):
+    parser = input_spec.get("parser", "CombineHarvester")
+    if parser == "inputshapes":
+        return rootfile_parser_inputshapes.Rootfile_parser(
+            input_spec["file"], input_spec["variable"])
+    if parser in ["CombineHarvester", "standard"]:
+        return rootfile_parser.Rootfile_parser(input_spec["file"], parser)
+    logger.fatal("Unknown parser %s in plot spec!" % parser)
+    raise Exception
+
+
+def _color(value):
+    if isinstance(value, basestring):
+        if not value in styles.color_dict:
+            logger.fatal("Color %s is not defined in styles.color_dict!" % value)
+            raise Exception
+        return styles.color_dict[value]
+    return value
+
+
+# calls a method with the arguments given in a spec: lists are unpacked, True calls without argument and False skips the call
+def _call(method, value, unpack=True):
+    if value is True:
+        method()
+    elif value is False or value == None:
+        return
+    elif isinstance(value, list) and unpack:
+        method(*value)
+    else:
+        method(value)
+
+
+def _targets(plot, entry):
+    if "subplot" in entry:
+        return [plot.subplot(entry["subplot"])]
+    if "subplots" in entry:
+        return [plot.subplot(index) for index in entry["subplots"]]
+    return [plot.subplot(index) for index in range(plot.nsubplots)]
+
+
+# returns the TH1 of histograms held as arrays (see hist_arrays.ArrayHist), so that sums can be built with the TH1 interface
+def _th1(hist):
+    if isinstance(hist, hist_arrays.ArrayHist):
+        return hist.th1()
+    return hist
+
+
+def _resolve_style(style):
+    style = dict(style)
+    for option in _color_options:
+        if option in style:
+            style[option] = _color(style[option])
+    return style
+
+
+def _apply_panel_options(subplot, options):
+    for option, value in options.items():
+        if option in _panel_options:
+            # the label replacements are passed as a single list
+            _call(getattr(subplot, _panel_options[option]), value,
+                  unpack=not option in ["xlabels", "ylabels"])
+
+
+# returns the input histograms of the spec in the order of its histograms section
+def read_hists(spec, source=None):
+    if source == None:
+        source = open_input(spec["input"])
+    return [source.get(*entry["get"]) for entry in spec.get("histograms", [])]
+
+
+# builds and draws the plot described by the spec and returns it. The histograms are read with the given parser or the parser defined in the spec's input section,
+# unless they are passed as returned by read_hists.
+def build_plot(spec, source=None, hists=None):
+    if hists == None:
+        hists = read_hists(spec, source)
+    plot = dumbledraw.Plot(spec["splits"], spec.get("style", "none"),
+                           share_hists=spec.get("share_hists", False),
+                           **spec.get("style_kwargs", {}))
+
+    # register histograms
+    for entry, hist in zip(spec.get("histograms", []), hists):
+        if not "subplot" in entry and not "subplots" in entry:
+            plot.add_hist(hist, entry["name"], entry.get("group", "invisible"))
+            if "style" in entry:
+                plot.setGraphStyle(entry["name"], **_resolve_style(entry["style"]))
+        else:
+            for subplot in _targets(plot, entry):
+                subplot.add_hist(hist, entry["name"], entry.get("group", "invisible"))
+                if "style" in entry:
+                    subplot.setGraphStyle(entry["name"], **_resolve_style(entry["style"]))
+
+    # sums of registered histograms, e.g. signal plus background
+    for entry in spec.get("sums", []):
+        for subplot in _targets(plot, entry):
+            total = _th1(subplot.peek_hist(entry["hists"][0])).Clone(entry["name"])
+            # the clone must not belong to the current directory, which may be an input file closed before the plot is drawn
+            total.SetDirectory(0)
+            for name in entry["hists"][1:]:
+                total.Add(_th1(subplot.peek_hist(name)))
+            subplot.add_hist(total, entry["name"], entry.get("group", "invisible"))
+            if "style" in entry:
+                subplot.setGraphStyle(entry["name"], **_resolve_style(entry["style"]))
+
+    # normalizations and stacks
+    for entry in spec.get("normalize", []):
+        for subplot in _targets(plot, entry):
+            subplot.normalize(entry["numerators"], entry["denominators"])
+    for entry in spec.get("stacks", []):
+        for subplot in _targets(plot, entry):
+            subplot.create_stack(entry["hists"], entry["name"],
+                                 entry.get("group", "invisible"))
+    for entry in spec.get("ratios", []):
+        plot.add_ratio(
+            entry["name"],
+            entry["numerators"],
+            entry["denominators"],
+            mode=entry.get("mode", "ratio"),
+            errors=entry.get("errors", "numerator"),
+            group_name=entry.get("group", "invisible"),
+            source=entry.get("source", 0),
+            target=entry["target"])
+        if "style" in entry:
+            plot.subplot(entry["target"]).setGraphStyle(entry["name"], **_resolve_style(entry["style"]))
+
+    # axis options and drawing
+    for subplot in _targets(plot, {}):
+        _apply_panel_options(subplot, spec.get("axes", {}))
+    for entry in spec.get("panels", []):
+        subplot = plot.subplot(entry["subplot"])
+        _apply_panel_options(subplot, entry)
+    for entry in spec.get("panels", []):
+        if "draw" in entry:
+            plot.subplot(entry["subplot"]).Draw(entry["draw"])
+
+    # legends, lines and labels
+    for entry in spec.get("legends", []):
+        plot.add_legend(
+            reference_subplot=entry.get("reference_subplot", 0),
+            width=entry.get("width", 0.30),
+            height=entry.get("height", 0.20),
+            pos=entry.get("pos", 3),
+            offset=entry.get("offset", 0.03))
+        legend = plot.legend(plot.nlegends - 1)
+        for entry_args in entry.get("entries", []):
+            legend.add_entry(*entry_args)
+        if "ncolumns" in entry:
+            legend.setNColumns(entry["ncolumns"])
+        if "textsize" in entry:
+            legend.scaleTextSize(entry["textsize"])
+        if "fillcolor" in entry:
+            legend.setFillColor(_color(entry["fillcolor"]))
+        if "alpha" in entry:
+            legend.setAlpha(entry["alpha"])
+        legend.Draw()
+    for entry in spec.get("lines", []):
+        entry = dict(entry)
+        if "color" in entry:
+            entry["color"] = _color(entry["color"])
+        plot.add_line(**entry)
+        plot.line(plot.nlines - 1).Draw()
+    labels = spec.get("labels", {})
+    if "cms" in labels:
+        plot.DrawCMS(**labels["cms"])
+    if "lumi" in labels:
+        if isinstance(labels["lumi"], dict):
+            plot.DrawLumi(**labels["lumi"])
+        else:
+            plot.DrawLumi(labels["lumi"])
+    if "channel_category" in labels:
+        if isinstance(labels["channel_category"], dict):
+            plot.DrawChannelCategoryLabel(**labels["channel_category"])
+        else:
+            plot.DrawChannelCategoryLabel(labels["channel_category"])
+    for entry in labels.get("text", []):
+        plot.DrawText(**entry)
+    return plot
+
+
+# returns the names of the files written for the spec
+def output_names(spec):
+    return [
+        "%s.%s" % (spec["output"]["name"], extension)
+        for extension in output_formats(spec)
+    ]
+
+
+def output_formats(spec):
+    return spec["output"].get("formats", _default_formats)
+
+
+# builds, draws and saves the plot described by the spec and returns the names of the written files.
+# With a render_cache.RenderCache, plots whose inputs and configuration did not change since they were written are not drawn again.
+# If a dictionary is given as timings, the times in seconds for reading, building and saving (per format) are filled in.
+# As module level function it can be passed to campaign.run_campaign to render many specs in parallel.
+def render(spec, source=None, cache=None, timings=None):
+    if timings == None:
+        timings = {}
+    outputs = output_names(spec)
+    start = time.time()
+    hists = read_hists(spec, source)
+    timings["read"] = time.time() - start
+    if cache != None:
+        key = cache.key(hists, spec)
+        if cache.is_fresh(outputs, key):
+            logger.info("Skip %s, inputs and configuration are unchanged" % ", ".join(outputs))
+            timings["skipped"] = True
+            return outputs
+    start = time.time()
+    # the canvas and all copies of the histograms are deleted once the plot is saved
+    with build_plot(spec, hists=hists) as plot:
+        timings["build"] = time.time() - start
+        timings.update(plot.save_all(spec["output"]["name"], output_formats(spec)))
+    if cache != None:
+        cache.store(outputs, key)
+    return outputs
+
+
+# picklable render function with fixed options, e.g. for the workers of campaign.run_campaign
+class Renderer(object):
+    def __init__(self, cache=None):
+        self._cache = cache
+
+    def __call__(self, spec):
+        return render(spec, cache=self._cache)
@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import cProfile
+import copy
+import functools
+import json
+import logging
+import os
+import time
+logger = logging.getLogger(__name__)
+
+# Opt-in instrumentation of Plot, Subplot, Legend and the parsers. It is enabled by setting the environment variable DUMBLEDRAW_PROFILE=1
+# before Dumbledraw is imported (or by calling enable before), so that production runs can be profiled without changing code:
+#   DUMBLEDRAW_PROFILE_DIR   directory of the reports and cProfile dumps, default dumbledraw_profile
+#   DUMBLEDRAW_PROFILE_TOP   number of slowest plots of which cProfile dumps are kept, default 0 (no cProfile)
+#
+# For each plot (from construction of the Plot until close or construction of the next Plot) the wall time and number of calls of each
+# instrumented method (inclusive time of nested calls), the number of deep copies and the bytes written are recorded.
+# Without profiling, the methods are not wrapped at all.
+
+_settings = {
+    "enabled": os.environ.get("DUMBLEDRAW_PROFILE", "0") not in ["", "0"],
+    "directory": os.environ.get("DUMBLEDRAW_PROFILE_DIR", "dumbledraw_profile"),
+    "top": int(os.environ.get("DUMBLEDRAW_PROFILE_TOP", "0")),
+}
+_records = []
+_current = [None]
+# stages measured outside of a plot, e.g. reading the inputs before the Plot is created, which are attached to the next plot
+_pending = [None]
+_nplots = [0]
+# (time, path) of the cProfile dumps kept by this process
+_profiles = []
+
+
+def enable(directory=None, top=None):
+    _settings["enabled"] = True
+    if directory != None:
+        _settings["directory"] = directory
+    if top != None:
+        _settings["top"] = top
+
+
+def enabled():
+    return _settings["enabled"]
+
+
+def _new_record():
+    record = {
+        "plot": None,
+        "pid": os.getpid(),
+        "start": time.time(),
+        "time": None,
+        "stages": {},
+        "deepcopies": 0,
+        "outputs": [],
+        "bytes_written": 0,
+        "profile": None
+    }
+    if _settings["top"] > 0:
+        record["_profiler"] = cProfile.Profile()
+        record["_profiler"].enable()
+    return record
+
+
+# starts the record of a new plot, which takes over the stages measured since the last plot. An unfinished record of the previous plot is finished first.
+def begin_plot():
+    if _current[0] != None:
+        end_plot()
+    record = _pending[0] if _pending[0] != None else _new_record()
+    _pending[0] = None
+    _nplots[0] += 1
+    record["plot"] = _nplots[0]
+    _current[0] = record
+
+
+def end_plot():
+    record = _current[0]
+    if record == None:
+        return
+    _current[0] = None
+    record["time"] = time.time() - record["start"]
+    for outputname in set(record["outputs"]):
+        if os.path.exists(outputname):
+            record["bytes_written"] += os.path.getsize(outputname)
+    profiler = record.pop("_profiler", None)
+    if profiler != None:
+        profiler.disable()
+        _keep_profile(record, profiler)
+    _records.append(record)
+
+
+# dumps the profile if the plot is among the slowest plots of this process and removes the dump which dropped out.
+# The dumps of all processes are reduced to the slowest plots overall by write_report.
+def _keep_profile(record, profiler):
+    if len(_profiles) >= _settings["top"] and record["time"] <= _profiles[0][0]:
+        return
+    if not os.path.isdir(_settings["directory"]):
+        os.makedirs(_settings["directory"])
+    path = os.path.join(_settings["directory"], "plot_%i_%i.prof" % (record["pid"], record["plot"]))
+    profiler.dump_stats(path)
+    record["profile"] = path
+    _profiles.append((record["time"], path))
+    _profiles.sort()
+    while len(_profiles) > _settings["top"]:
+        os.remove(_profiles.pop(0)[1])
+
+
+def _stage_record():
+    if _current[0] != None:
+        return _current[0]
+    if _pending[0] == None:
+        _pending[0] = _new_record()
+    return _pending[0]
+
+
+def _add_time(name, duration):
+    stages = _stage_record()["stages"]
+    if not name in stages:
+        stages[name] = [0, 0.]
+    stages[name][0] += 1
+    stages[name][1] += duration
+
+
+# returns the method wrapped with the time measurement of the given stage
+def timed(name, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        start = time.time()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _add_time(name, time.time() - start)
+    return wrapper
+
+
+# replaces the given methods of a class by timed versions, stages are named <prefix>.<method> with the class name as default prefix
+def instrument(cls, methods, prefix=None):
+    if not enabled():
+        return
+    for name in methods:
+        setattr(cls, name, timed("%s.%s" % (cls.__name__ if prefix == None else prefix, name), getattr(cls, name)))
+
+
+# instruments the lifecycle of Plot: a record is started by the constructor and finished by close. The files written by save and save_all are recorded.
+def instrument_plot(cls):
+    if not enabled():
+        return
+    init = timed("Plot.__init__", cls.__init__)
+    close = timed("Plot.close", cls.close)
+    save = timed("Plot.save", cls.save)
+    save_all = timed("Plot.save_all", cls.save_all)
+
+    @functools.wraps(init)
+    def profiled_init(self, *args, **kwargs):
+        begin_plot()
+        init(self, *args, **kwargs)
+
+    @functools.wraps(close)
+    def profiled_close(self, *args, **kwargs):
+        result = close(self, *args, **kwargs)
+        end_plot()
+        return result
+
+    @functools.wraps(save)
+    def profiled_save(self, outputname):
+        _stage_record()["outputs"].append(outputname)
+        return save(self, outputname)
+
+    @functools.wraps(save_all)
+    def profiled_save_all(self, basename, formats=None):
+        for extension in (["png", "pdf"] if formats == None else formats):
+            _stage_record()["outputs"].append("%s.%s" % (basename, extension))
+        return save_all(self, basename, formats)
+
+    cls.__init__ = profiled_init
+    cls.close = profiled_close
+    cls.save = profiled_save
+    cls.save_all = profiled_save_all
+
+
+# stands in for the copy module of an instrumented module and counts the deep copies
+class _CountingCopy(object):
+    def __init__(self, module):
+        self._module = module
+
+    def deepcopy(self, obj, *args):
+        _stage_record()["deepcopies"] += 1
+        return self._module.deepcopy(obj, *args)
+
+    def copy(self, obj):
+        return self._module.copy(obj)
+
+
+def count_deepcopies(module):
+    if not enabled():
+        return
+    module.copy = _CountingCopy(copy)
+
+
+# returns the finished records of this process and removes them, e.g. to send them from a worker to the campaign runner.
+# Stages measured after the last plot stay pending for the next plot.
+def take_records():
+    end_plot()
+    records = list(_records)
+    del _records[:]
+    return records
+
+
+# removes the stages measured outside of any plot and returns them as record, or None
+def take_pending():
+    record = _pending[0]
+    _pending[0] = None
+    if record != None:
+        profiler = record.pop("_profiler", None)
+        if profiler != None:
+            profiler.disable()
+    return record
+
+
+def add_records(records):
+    _records.extend(records)
+
+
+# aggregates the records per stage
+def aggregate(records):
+    stages = {}
+    for record in records:
+        for name, (calls, duration) in record["stages"].items():
+            if not name in stages:
+                stages[name] = {"calls": 0, "time": 0., "max": 0.}
+            stages[name]["calls"] += calls
+            stages[name]["time"] += duration
+            stages[name]["max"] = max(stages[name]["max"], duration)
+    return {
+        "nplots": len(records),
+        "time": sum([record["time"] for record in records]),
+        "deepcopies": sum([record["deepcopies"] for record in records]),
+        "bytes_written": sum([record["bytes_written"] for record in records]),
+        "stages": stages,
+        "slowest": [[record["pid"], record["plot"]] for record in _slowest(records, 10)],
+    }
+
+
+def _slowest(records, n):
+    return sorted(records, key=lambda record: -record["time"])[:n]
+
+
+# keeps the cProfile dumps of the slowest plots of all records, the dumps of the other plots are removed
+def _prune_profiles(records):
+    kept = set([id(record) for record in _slowest(records, _settings["top"])])
+    for record in records:
+        if record["profile"] != None and not id(record) in kept:
+            if os.path.exists(record["profile"]):
+                os.remove(record["profile"])
+            record["profile"] = None
+    _profiles[:] = [(time_, path) for time_, path in _profiles if os.path.exists(path)]
+
+
+def summary(report):
+    lines = [
+        "%i plots in %.2f s, %i deep copies, %.1f MB written" %
+        (report["nplots"], report["time"], report["deepcopies"], report["bytes_written"] / 1024.**2),
+        "%-36s %10s %12s %12s" % ("stage", "calls", "time [s]", "max [s]")
+    ]
+    for name, stage in sorted(report["stages"].items(), key=lambda item: -item[1]["time"]):
+        lines.append("%-36s %10i %12.4f %12.4f" % (name, stage["calls"], stage["time"], stage["max"]))
+    return "\n".join(lines)
+
+
+# writes the records of this process (and those added via add_records) as report.json and report.txt to the profile directory.
+# The records are consumed, so that each report of a long running process (watch mode, render server) covers the plots since the previous one.
+def write_report():
+    records = take_records()
+    _prune_profiles(records)
+    # the kept dumps belong to this report and do not compete with the plots of the next one
+    del _profiles[:]
+    report = aggregate(records)
+    report["plots"] = records
+    # stages measured after the last plot, e.g. of an aborted task
+    unassigned = take_pending()
+    report["unassigned"] = None if unassigned == None else unassigned["stages"]
+    if not os.path.isdir(_settings["directory"]):
+        os.makedirs(_settings["directory"])
+    with open(os.path.join(_settings["directory"], "report.json"), "w") as reportfile:
+        json.dump(report, reportfile, indent=2, sort_keys=True)
+    text = summary(report)
+    with open(os.path.join(_settings["directory"], "report.txt"), "w") as reportfile:
+        reportfile.write(text + "\n")
+    logger.info("Profile of %i plots written to %s\n%s" % (len(records), _settings["directory"], text))
+    return report
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import logging
+import os
+logger = logging.getLogger(__name__)
+
+import hist_arrays
+from version import __version__
+
+
+# Opt-in cache of rendered plots. Each output file is keyed on the contents of the input histograms,
+# the plot configuration and the Dumbledraw version. The keys are stored as one small file per output
+# in the cache directory, so that parallel workers do not compete for a common index.
+class RenderCache(object):
+    def __init__(self, directory=".dumbledraw_cache"):
+        self._directory = directory
+        if not os.path.exists(self._directory):
+            try:
+                os.makedirs(self._directory)
+            except OSError:  # created in the meantime by another worker
+                pass
+        self._nskipped = 0
+        self._nrendered = 0
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @property
+    def nskipped(self):
+        return self._nskipped
+
+    @property
+    def nrendered(self):
+        return self._nrendered
+
+    # returns the key of a plot built from the given histograms and configuration (any JSON serializable object)
+    def key(self, hists, config):
+        digest = hashlib.sha1()
+        digest.update(__version__.encode("utf-8"))
+        digest.update(json.dumps(config, sort_keys=True).encode("utf-8"))
+        for hist in hists:
+            contents = hist_arrays.get_contents(hist)
+            digest.update(hist_arrays.get_edges(hist).tobytes())
+            digest.update(contents.tobytes())
+            digest.update(hist_arrays.get_sumw2(hist, contents).tobytes())
+        return digest.hexdigest()
+
+    def _keyfile(self, outputname):
+        return os.path.join(
+            self._directory,
+            hashlib.sha1(os.path.abspath(outputname).encode("utf-8")).hexdigest())
+
+    # returns True if all outputs exist and were rendered with the given key
+    def is_fresh(self, outputnames, key):
+        for outputname in outputnames:
+            if not os.path.exists(outputname):
+                return False
+            keyfile = self._keyfile(outputname)
+            if not os.path.exists(keyfile):
+                return False
+            with open(keyfile) as f:
+                if f.read().strip() != key:
+                    return False
+        self._nskipped += 1
+        return True
+
+    def store(self, outputnames, key):
+        for outputname in outputnames:
+            keyfile = self._keyfile(outputname)
+            # write to a temporary file first, so that an interrupted write never leaves a matching key behind
+            with open(keyfile + ".tmp%i" % os.getpid(), "w") as f:
+                f.write(key)
+            os.rename(keyfile + ".tmp%i" % os.getpid(), keyfile)
+        self._nrendered += 1
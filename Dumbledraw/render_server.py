@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import socket
+import time
+import traceback
+logger = logging.getLogger(__name__)
+
+import plotspec
+import rootfile_pool
+import styles
+
+# Long running render worker, which keeps ROOT, the plotting style, the label and color tables and the input files warm.
+# Requests and responses are JSON objects, one per line, e.g.
+#
+# {"id": 1, "spec": {...}}                 renders the given plot spec
+# {"id": 2, "spec_file": "plot.yaml"}      renders the spec read from the file
+# {"id": 3, "command": "reload"}           closes all input files, e.g. after they have been rewritten in place
+# {"id": 4, "command": "stats"}            returns the number of handled requests and open input files
+# {"id": 5, "command": "shutdown"}
+#
+# Each response contains the id of the request, ok, and either the written outputs with the timings of reading, building and saving or the error.
+
+
+class RenderServer(object):
+    def __init__(self, style="ModTDR", style_kwargs=None, cache=None):
+        start = time.time()
+        import ROOT
+        ROOT.gROOT.SetBatch(True)
+        styles.SetStyle(style, **({} if style_kwargs == None else style_kwargs))
+        # fill the lazy tables now, so that the first request does not pay for them
+        try:
+            len(styles.color_dict)
+            len(styles.legend_label_dict)
+        except (IOError, OSError) as error:
+            logger.warning("Cannot preload tables: %s" % error)
+        self._cache = cache
+        # parsers of the inputs with the modification time and path of their file by their input spec, files are reopened if they have been modified
+        self._sources = {}
+        self._nrequests = 0
+        self._running = True
+        logger.info("Render server ready after %.2f s" % (time.time() - start))
+
+    @property
+    def running(self):
+        return self._running
+
+    def _source(self, input_spec):
+        key = json.dumps(input_spec, sort_keys=True)
+        path = os.path.abspath(input_spec["file"])
+        mtime = os.path.getmtime(path)
+        if any([source_path == path and source_mtime != mtime for source, source_mtime, source_path in self._sources.values()]):
+            logger.info("Reopening modified input %s" % input_spec["file"])
+            self._evict(path)
+        if not key in self._sources:
+            self._sources[key] = (plotspec.open_input(input_spec), mtime, path)
+        return self._sources[key][0]
+
+    # closes all cached sources of a file together with the pooled handle they share, so that no source keeps using the closed file
+    def _evict(self, path):
+        for key in [key for key, (source, mtime, source_path) in self._sources.items() if source_path == path]:
+            self._sources.pop(key)[0].close()
+        rootfile_pool.close(path, force=True)
+
+    def reload(self):
+        for source, mtime, path in self._sources.values():
+            source.close()
+        self._sources = {}
+        rootfile_pool.close_all()
+
+    # handles a single request and returns the response, errors are reported in the response instead of being raised
+    def handle(self, request):
+        self._nrequests += 1
+        response = {"id": request.get("id")}
+        start = time.time()
+        try:
+            command = request.get("command", "render")
+            if command == "render":
+                spec = request["spec"] if "spec" in request else plotspec.load_spec(request["spec_file"])
+                timings = {}
+                response["outputs"] = plotspec.render(
+                    spec, source=self._source(spec["input"]), cache=self._cache, timings=timings)
+                response["timings"] = timings
+            elif command == "reload":
+                self.reload()
+            elif command == "stats":
+                response["requests"] = self._nrequests
+                response["files"] = rootfile_pool.stats()
+                response["colors"] = styles.color_registry_stats()
+            elif command == "shutdown":
+                self._running = False
+            else:
+                raise ValueError("Unknown command %s" % command)
+            response["ok"] = True
+        except Exception:
+            response["ok"] = False
+            response["error"] = traceback.format_exc()
+            logger.error("Request %s failed:\n%s" % (str(request.get("id")), response["error"]))
+        response["time"] = time.time() - start
+        return response
+
+    # reads requests from a stream of JSON lines and writes the responses to the output stream until shutdown or end of input
+    def serve_lines(self, instream, outstream):
+        for line in iter(instream.readline, ""):
+            if line.strip() == "":
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as error:
+                response = {"id": None, "ok": False, "error": "Invalid request: %s" % error}
+            else:
+                response = self.handle(request)
+            outstream.write(json.dumps(response) + "\n")
+            outstream.flush()
+            if not self._running:
+                break
+
+    # accepts connections on a unix socket, each connection is a stream of JSON lines as in serve_lines
+    def serve_socket(self, path):
+        if os.path.exists(path):
+            os.remove(path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(1)
+        logger.info("Listening on %s" % path)
+        try:
+            while self._running:
+                connection, address = server.accept()
+                stream = connection.makefile("rw")
+                try:
+                    self.serve_lines(stream, stream)
+                finally:
+                    stream.close()
+                    connection.close()
+        finally:
+            server.close()
+            os.remove(path)
+            self.reload()
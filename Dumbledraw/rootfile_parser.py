@@ -6,13 +6,19 @@ import ROOT
 import copy
 logger = logging.getLogger(__name__)
 
+import array_cache
+import hist_arrays
+import rootfile_pool
+import profiling
+
 
 class Rootfile_parser(object):
     def __init__(self, inputrootfilename, mode="CombineHarvester"):
         self._rootfilename = inputrootfilename
-        self._rootfile = ROOT.TFile(self._rootfilename, "READ")
+        self._pooled = rootfile_pool.acquire(self._rootfilename)
+        self._arrays = None
         self._type = "control"
-        content = [entry.GetName() for entry in self._rootfile.GetListOfKeys()]
+        content = self._keys("")[0]
         for entry in content:
             if entry.endswith("prefit"):
                 self._type = "prefit"
@@ -32,9 +38,17 @@ class Rootfile_parser(object):
 
     @property
     def rootfile(self):
-        return self._rootfile
+        return self._pooled.rootfile
 
-    def get(self, era, channel, category, process, syst=None):
+    @property
+    def key_list_walks(self):
+        # number of times the key list of each directory has been walked, should never exceed one
+        return self._pooled.key_list_walks
+
+    def _keys(self, directory):
+        return self._pooled.keys(directory)
+
+    def _get_hist_hash(self, era, channel, category, process, syst=None):
         if syst != None and self._type != "control":
             logger.fatal(
                 "Uncertainty shapes are only available in control plots!")
@@ -48,62 +62,153 @@ class Rootfile_parser(object):
             unc="{unc}")
         if self._type == "control":
             syst = "" if syst == None else "_" + syst
-            hist_hash = hist_hash.format(plottype="", unc=syst)
-        else:
-            hist_hash = hist_hash.format(plottype="_" + self._type, unc="")
+            return hist_hash.format(plottype="", unc=syst)
+        return hist_hash.format(plottype="_" + self._type, unc="")
+
+    def available_processes(self, era, channel, category):
+        directory = self._get_hist_hash(era, channel, category, "").split('/')[0]
+        return list(self._keys(directory)[0])
+
+    # returns the systematics, for which Up and Down shapes of the process are available, found via the key index of the directory.
+    # Keys of other processes whose names start with the name of the given process, e.g. ggH_htt for ggH, are skipped.
+    def available_systematics(self, era, channel, category, process):
+        directory, prefix = self._get_hist_hash(era, channel, category, process, "").split('/')
+        available_processes, available_set = self._keys(directory)
+        systematics = []
+        for name in available_processes:
+            if not (name.startswith(prefix) and name.endswith("Up")):
+                continue
+            syst = name[len(prefix):-2]
+            if syst == "" or not prefix + syst + "Down" in available_set:
+                continue
+            owner = [name[:i] for i in range(len(prefix), len(name)) if name[i] == "_" and name[:i] in available_set]
+            if len(owner) > 0:
+                continue
+            systematics.append(syst)
+        return systematics
+
+    def exists(self, era, channel, category, process, syst=None):
+        directory, name = self._get_hist_hash(era, channel, category, process, syst).split('/')
+        return name in self._keys(directory)[1]
+
+    def get(self, era, channel, category, process, syst=None):
+        hist_hash = self._get_hist_hash(era, channel, category, process, syst)
         logger.debug(
             "Try to access %s in %s" % (hist_hash, self._rootfilename))
         # perform check if file is available and otherwise return some dummy TH1F
-        available_processes = [entry.GetName() for entry in self._rootfile.Get(hist_hash.split('/')[0]).GetListOfKeys()]
-        if hist_hash.split('/')[1] in available_processes:
-            return self._rootfile.Get(hist_hash)
+        directory, name = hist_hash.split('/')
+        available_processes, available_set = self._keys(directory)
+        if name in available_set:
+            hist = self._pooled.rootfile.Get(hist_hash)
+            self._pooled.record(hist_hash, hist)
+            return hist
         elif len(available_processes) != 0:
             logger.warning("%s in %s does not exist !" % (hist_hash, self._rootfilename))
             logger.debug(" Available Histograms are: %s" % available_processes)
             logger.debug(" Returning a dummy histogram ")
-            dummy = self._rootfile.Get('{}/{}'.format(hist_hash.split('/')[0],available_processes[0]))
-            dummy.Reset()
-            dummy.SetTitle(process)
-            dummy.SetName(hist_hash)
-            return dummy
+            self._pooled.record(hist_hash)
+            return self._make_dummy(
+                self._pooled.rootfile.Get('{}/{}'.format(directory, available_processes[0])),
+                hist_hash, process)
         else:
-            logger.fatal(" None of the requested Histograms are available in %s. Aborting." % hist_hash.split('/')[0])
+            logger.fatal(" None of the requested Histograms are available in %s. Aborting." % directory)
             raise Exception
 
+    # clones the template, otherwise the histogram held in memory by the file would be reset
+    def _make_dummy(self, template, hist_hash, process):
+        dummy = template.Clone(hist_hash)
+        dummy.Reset()
+        dummy.SetTitle(process)
+        dummy.SetName(hist_hash)
+        return dummy
+
+    # returns the histograms for the cartesian product of the inputs as dictionary with keys (era, channel, category, process, syst).
+    # Each directory is opened once and the dummy histogram for missing processes is resolved once per directory.
+    def get_many(self, eras, channels, categories, processes, systs=None):
+        if isinstance(eras, basestring):
+            eras = [eras]
+        if isinstance(channels, basestring):
+            channels = [channels]
+        if isinstance(categories, basestring):
+            categories = [categories]
+        if isinstance(processes, basestring):
+            processes = [processes]
+        if systs == None or isinstance(systs, basestring):
+            systs = [systs]
+        hists = {}
+        for era in eras:
+            for channel in channels:
+                for category in categories:
+                    directory = self._get_hist_hash(era, channel, category, "").split('/')[0]
+                    available_processes, available_set = self._keys(directory)
+                    if len(available_processes) == 0:
+                        logger.fatal(" None of the requested Histograms are available in %s. Aborting." % directory)
+                        raise Exception
+                    tdirectory = self._pooled.rootfile.Get(directory)
+                    template = None
+                    for process in processes:
+                        for syst in systs:
+                            name = self._get_hist_hash(era, channel, category, process, syst).split('/')[1]
+                            if name in available_set:
+                                hist = tdirectory.Get(name)
+                                self._pooled.record("{}/{}".format(directory, name), hist)
+                            else:
+                                self._pooled.record("{}/{}".format(directory, name))
+                                logger.warning("%s/%s in %s does not exist !" % (directory, name, self._rootfilename))
+                                if template == None:
+                                    template = tdirectory.Get(available_processes[0])
+                                hist = self._make_dummy(template, "{}/{}".format(directory, name), process)
+                            hists[(era, channel, category, process, syst)] = hist
+        logger.debug("Read %i histograms from %s" % (len(hists), self._rootfilename))
+        return hists
+
+
+    # columnar cache of the file (see array_cache.py), which is loaded again if the file has changed. None if the cache is disabled or not available.
+    def _array_cache(self):
+        if self._arrays == None or not self._arrays.is_fresh():
+            self._arrays = array_cache.load(self._rootfilename)
+        return self._arrays
+
+    # returns bin edges, contents, upper and lower errors as float64 arrays reading the histogram only once.
+    # With the array cache enabled, edges and contents are read-only views of the cache.
+    def get_arrays(self, era, channel, category, process, syst=None):
+        cache = self._array_cache()
+        if cache != None:
+            hist_hash = self._get_hist_hash(era, channel, category, process, syst)
+            if hist_hash in cache:
+                self._pooled.record(hist_hash, cells=cache.get_cells(hist_hash))
+                return cache.get_arrays(hist_hash)
+        return hist_arrays.get_arrays(
+            self.get(era, channel, category, process, syst))
+
+    # returns a dictionary with the arrays of get_arrays for each of the given processes
+    def get_arrays_batch(self, era, channel, category, processes, syst=None):
+        return dict((process,
+                     self.get_arrays(era, channel, category, process, syst))
+                    for process in processes)
 
     def get_bins(self, era, channel, category, process, syst=None):
-        hist = self.get(era, channel, category, process, syst)
-        nbins = hist.GetNbinsX()
-        bins = []
-        for i in range(nbins):
-            bins.append(hist.GetBinLowEdge(i + 1))
-        bins.append(hist.GetBinLowEdge(i + 1) + hist.GetBinWidth(i + 1))
-        return bins
+        return self.get_arrays(era, channel, category, process, syst)[0].tolist()
 
     def get_values(self, era, channel, category, process, syst=None):
-        hist = self.get(era, channel, category, process, syst)
-        nbins = hist.GetNbinsX()
-        values = []
-        for i in range(nbins):
-            values.append(hist.GetBinContent(i + 1))
-        return values
+        return self.get_arrays(era, channel, category, process, syst)[1].tolist()
 
     def get_values_up(self, era, channel, category, process, syst=None):
-        hist = self.get(era, channel, category, process, syst)
-        nbins = hist.GetNbinsX()
-        values = []
-        for i in range(nbins):
-            values.append(hist.GetBinErrDown(i + 1))
-        return values
+        return self.get_arrays(era, channel, category, process, syst)[2].tolist()
 
     def get_values_down(self, era, channel, category, process, syst=None):
-        hist = self.get(era, channel, category, process, syst)
-        nbins = hist.GetNbinsX()
-        values = []
-        for i in range(nbins):
-            values.append(hist.GetBinErrDown(i + 1))
-        return values
+        return self.get_arrays(era, channel, category, process, syst)[3].tolist()
+
+    # releases the shared file handle, the file itself is closed via rootfile_pool
+    def close(self):
+        if self._pooled != None:
+            rootfile_pool.release(self._pooled)
+            self._pooled = None
 
     def __del__(self):
-        logger.debug("Closing rootfile %s" % (self._rootfilename))
-        self._rootfile.Close()
+        logger.debug("Releasing rootfile %s" % (self._rootfilename))
+        self.close()
+
+
+# opt-in instrumentation, see profiling.py
+profiling.instrument(Rootfile_parser, ["__init__", "get", "get_many", "get_arrays", "get_arrays_batch"])
@@ -5,10 +5,23 @@ import logging
 import ROOT
 import copy
 logger = logging.getLogger(__name__)
-import yaml
 import os
 
-mass_dict= yaml.load(open("shapes/mass_dict_nmssm.yaml"), Loader=yaml.Loader)["plots"]
+import array_cache
+import hist_arrays
+import rootfile_pool
+import profiling
+import tables
+
+
+# returns the map entries of the NMSSM signals of the mass_dict, which is only read if a process is not in the base map (see tables.ExtendedDict)
+def _nmssm_processes(nmssm_value):
+    process_map = {}
+    for heavy_mass, light_mass in tables.nmssm_mass_points():
+        name = "NMSSM_{heavy_mass}_125_{light_mass}".format(heavy_mass=heavy_mass,light_mass=light_mass)
+        process_map[name] = name if nmssm_value == None else nmssm_value
+    return process_map
+
 
 class Rootfile_parser(object):
 
@@ -56,26 +69,22 @@ class Rootfile_parser(object):
         "HTT" : "HTT"
     }
 
-    for heavy_mass in mass_dict["heavy_mass"]:
-        light_masses = mass_dict["light_mass_coarse"] if heavy_mass > 1001 else mass_dict["light_mass_fine"]
-        for light_mass in light_masses:
-            if light_mass+125<heavy_mass:
-                _dataset_map["NMSSM_{heavy_mass}_125_{light_mass}".format(heavy_mass=heavy_mass,light_mass=light_mass)] = "NMSSM_{heavy_mass}_125_{light_mass}".format(heavy_mass=heavy_mass,light_mass=light_mass)
-                _process_map["NMSSM_{heavy_mass}_125_{light_mass}".format(heavy_mass=heavy_mass,light_mass=light_mass)] = "NMSSM"
+    _dataset_map = tables.ExtendedDict(_dataset_map, lambda: _nmssm_processes(None))
+    _process_map = tables.ExtendedDict(_process_map, lambda: _nmssm_processes("NMSSM"))
 
     
 
     def __init__(self, inputrootfilename, variable):
         self._rootfilename = inputrootfilename
-        self._rootfile = ROOT.TFile(self._rootfilename, "READ")
+        self._pooled = rootfile_pool.acquire(self._rootfilename)
         self._variable = variable
+        self._arrays = None
 
     @property
     def rootfile(self):
-        return self._rootfile
+        return self._pooled.rootfile
 
-    def get(self, channel, process, category, shape_type="Nominal"):
-        print(category)
+    def _get_hist_hash(self, channel, process, category, shape_type="Nominal"):
         dataset = self._dataset_map[process]
         if category == "None":
             category = "-" + self._process_map[process]
@@ -83,39 +92,93 @@ class Rootfile_parser(object):
             category = ""
         else:
             category = "-" + "-".join([category, self._process_map[process]])
-        hist_hash = "{dataset}#{channel}{category}#{shape_type}#{variable}".format(
+        return "{dataset}#{channel}{category}#{shape_type}#{variable}".format(
             dataset=dataset,
             channel=channel,
             category=category,
             shape_type=shape_type,
             variable=self._variable)
+
+    def get(self, channel, process, category, shape_type="Nominal"):
+        hist_hash = self._get_hist_hash(channel, process, category, shape_type)
         logger.debug("Try to access %s in %s" % (hist_hash,
                                                  self._rootfilename))
-        print("rootfile: " , self._rootfile.Get(hist_hash), " hash: ", hist_hash)
-
-        return self._rootfile.Get(hist_hash)
-
+        hist = self._pooled.rootfile.Get(hist_hash)
+        self._pooled.record(hist_hash, hist)
+        return hist
+
+
+    # returns the histograms for the cartesian product of the inputs as dictionary with keys (channel, process, category, shape_type).
+    # The file has a flat structure, so the key list is walked only once and missing histograms are returned as None.
+    def get_many(self, channels, processes, categories, shape_types="Nominal"):
+        if isinstance(channels, basestring):
+            channels = [channels]
+        if isinstance(processes, basestring):
+            processes = [processes]
+        if isinstance(categories, basestring):
+            categories = [categories]
+        if isinstance(shape_types, basestring):
+            shape_types = [shape_types]
+        key_set = self._pooled.keys("")[1]
+        hists = {}
+        for channel in channels:
+            for process in processes:
+                for category in categories:
+                    for shape_type in shape_types:
+                        hist_hash = self._get_hist_hash(channel, process, category, shape_type)
+                        if hist_hash in key_set:
+                            hist = self._pooled.rootfile.Get(hist_hash)
+                        else:
+                            logger.warning("%s in %s does not exist !" % (hist_hash, self._rootfilename))
+                            hist = None
+                        self._pooled.record(hist_hash, hist)
+                        hists[(channel, process, category, shape_type)] = hist
+        logger.debug("Read %i histograms from %s" % (len(hists), self._rootfilename))
+        return hists
 
     def list_contents(self):
-        return [key.GetTitle() for key in self._rootfile.GetListOfKeys()]
-
-    def get_bins(self, channel, category):
-        hist = self.get(channel, category)
-        nbins = hist.GetNbinsX()
-        bins = []
-        for i in range(nbins):
-            bins.append(hist.GetBinLowEdge(i + 1))
-        bins.append(hist.GetBinLowEdge(i + 1) + hist.GetBinWidth(i + 1))
-        return bins
-
-    def get_values(self, channel, category):
-        hist = self.get(channel, category)
-        nbins = hist.GetNbinsX()
-        values = []
-        for i in range(nbins):
-            values.append(hist.GetBinContent(i + 1))
-        return values
+        return [key.GetTitle() for key in self._pooled.rootfile.GetListOfKeys()]
+
+    # columnar cache of the file (see array_cache.py), which is loaded again if the file has changed. None if the cache is disabled or not available.
+    def _array_cache(self):
+        if self._arrays == None or not self._arrays.is_fresh():
+            self._arrays = array_cache.load(self._rootfilename)
+        return self._arrays
+
+    # returns bin edges, contents, upper and lower errors as float64 arrays reading the histogram only once.
+    # With the array cache enabled, edges and contents are read-only views of the cache.
+    def get_arrays(self, channel, process, category, shape_type="Nominal"):
+        cache = self._array_cache()
+        if cache != None:
+            hist_hash = self._get_hist_hash(channel, process, category, shape_type)
+            if hist_hash in cache:
+                self._pooled.record(hist_hash, cells=cache.get_cells(hist_hash))
+                return cache.get_arrays(hist_hash)
+        return hist_arrays.get_arrays(
+            self.get(channel, process, category, shape_type))
+
+    # returns a dictionary with the arrays of get_arrays for each of the given processes
+    def get_arrays_batch(self, channel, processes, category, shape_type="Nominal"):
+        return dict((process,
+                     self.get_arrays(channel, process, category, shape_type))
+                    for process in processes)
+
+    def get_bins(self, channel, process, category, shape_type="Nominal"):
+        return self.get_arrays(channel, process, category, shape_type)[0].tolist()
+
+    def get_values(self, channel, process, category, shape_type="Nominal"):
+        return self.get_arrays(channel, process, category, shape_type)[1].tolist()
+
+    # releases the shared file handle, the file itself is closed via rootfile_pool
+    def close(self):
+        if self._pooled != None:
+            rootfile_pool.release(self._pooled)
+            self._pooled = None
 
     def __del__(self):
-        logger.debug("Closing rootfile %s" % (self._rootfilename))
-        self._rootfile.Close()
+        logger.debug("Releasing rootfile %s" % (self._rootfilename))
+        self.close()
+
+
+# opt-in instrumentation, see profiling.py
+profiling.instrument(Rootfile_parser, ["__init__", "get", "get_many", "get_arrays", "get_arrays_batch"], "inputshapes.Rootfile_parser")
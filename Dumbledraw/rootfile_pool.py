@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import atexit
+import logging
+import os
+logger = logging.getLogger(__name__)
+
+import hist_arrays
+
+# process wide registry of the opened input files, shared by all parser instances
+_pool = {}
+_nopened = [0]
+# active recorders of the histograms read by the parsers, see start_recording
+_recorders = []
+
+
+class PooledFile(object):
+    def __init__(self, filename):
+        import ROOT
+        self._filename = filename
+        self._path = os.path.abspath(filename)
+        logger.debug("Opening rootfile %s" % filename)
+        self._rootfile = ROOT.TFile(filename, "READ")
+        _nopened[0] += 1
+        self._refcount = 0
+        self._closed = False
+        # lazy index of the key names per directory, see keys
+        self._key_index = {}
+        self._key_list_walks = {}
+
+    @property
+    def filename(self):
+        return self._filename
+
+    @property
+    def rootfile(self):
+        self._check_open()
+        return self._rootfile
+
+    @property
+    def closed(self):
+        return self._closed
+
+    @property
+    def refcount(self):
+        return self._refcount
+
+    @property
+    def key_list_walks(self):
+        # number of times the key list of each directory has been walked, should never exceed one
+        return dict(self._key_list_walks)
+
+    # a handle closed by close(filename, force=True) must not be used by the parsers still holding it, otherwise they would read empty plots
+    def _check_open(self):
+        if self._closed:
+            logger.fatal("Rootfile %s has been closed, the parsers using it have to be created again!" % self._filename)
+            raise Exception
+
+    # returns the key names of a directory as ordered list and as set. The key list of each directory is walked at most once per file.
+    def keys(self, directory=""):
+        self._check_open()
+        if not directory in self._key_index:
+            tdirectory = self._rootfile if directory == "" else self._rootfile.Get(directory)
+            if tdirectory:
+                names = [entry.GetName() for entry in tdirectory.GetListOfKeys()]
+            else:
+                names = []
+            self._key_list_walks[directory] = self._key_list_walks.get(directory, 0) + 1
+            self._key_index[directory] = (names, set(names))
+        return self._key_index[directory]
+
+    # notes that the parser has read the histogram with the given key (path within the file), if recording is active.
+    # The content hash is taken from the histogram as read (None if it is missing) or from the cells (edges, contents, sumw2) of the array cache.
+    def record(self, key, hist=None, cells=None):
+        if len(_recorders) == 0:
+            return
+        digest = hist_arrays.cells_hash(*cells) if cells != None else hist_arrays.content_hash(hist)
+        for recorder in _recorders:
+            recorder[(self._path, key)] = digest
+
+    def close(self):
+        if self._refcount > 0:
+            logger.warning("Closing rootfile %s which is still used by %i parsers" %
+                           (self._filename, self._refcount))
+        logger.debug("Closing rootfile %s" % self._filename)
+        self._rootfile.Close()
+        self._closed = True
+        self._key_index = {}
+
+
+# returns the shared handle of the given file and increments its reference count. The file is opened on first request only.
+def acquire(filename):
+    path = os.path.abspath(filename)
+    if not path in _pool:
+        _pool[path] = PooledFile(filename)
+    entry = _pool[path]
+    entry._refcount += 1
+    return entry
+
+
+# decrements the reference count of a handle. The file is kept open for later parsers until close or close_all is called.
+def release(entry):
+    if entry._refcount > 0:
+        entry._refcount -= 1
+
+
+# closes the given file. Files still used by parsers are only closed if force is set.
+def close(filename, force=False):
+    path = os.path.abspath(filename)
+    if not path in _pool:
+        return
+    if _pool[path].refcount > 0 and not force:
+        logger.debug("Keep rootfile %s open, still used by %i parsers" %
+                     (filename, _pool[path].refcount))
+        return
+    _pool.pop(path).close()
+
+
+# closes all files of the pool, regardless of their reference counts
+def close_all():
+    for path in list(_pool.keys()):
+        _pool.pop(path).close()
+
+
+# drops all handles without closing them, needed in forked worker processes which must open their own handles
+def forget_all():
+    _pool.clear()
+
+
+# starts recording the content hashes of all histograms read by the parsers and returns the dictionary with keys (absolute file path, key),
+# which is filled until stop_recording
+def start_recording():
+    recorder = {}
+    _recorders.append(recorder)
+    return recorder
+
+
+def stop_recording(recorder):
+    for i, active in enumerate(_recorders):
+        if active is recorder:
+            del _recorders[i]
+            return
+
+
+# returns the number of files opened by the pool so far and the reference counts of the currently open files
+def stats():
+    return {
+        "opened": _nopened[0],
+        "refcounts": dict((entry.filename, entry.refcount) for entry in _pool.values())
+    }
+
+
+atexit.register(close_all)
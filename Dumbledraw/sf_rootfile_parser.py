@@ -6,19 +6,23 @@ import ROOT
 import copy
 logger = logging.getLogger(__name__)
 
+import hist_arrays
+import rootfile_pool
+import profiling
+
 
 class ScaleFactor_Rootfile_parser(object):
     def __init__(self, inputrootfilename):
         self._rootfilename = inputrootfilename
-        self._rootfile = ROOT.TFile(self._rootfilename, "READ")
-        content = [entry.GetName() for entry in self._rootfile.GetListOfKeys()]
+        self._pooled = rootfile_pool.acquire(self._rootfilename)
+        content = self._pooled.keys("")[0]
         self.Nbins = len(content)
         logger.debug("Identified {} histograms in rootfile {} ".format(len(content), inputrootfilename))
         self._hist_hash = "{variable}_projx_{etabin}"
 
     @property
     def rootfile(self):
-        return self._rootfile
+        return self._pooled.rootfile
 
 
 
@@ -28,42 +32,42 @@ class ScaleFactor_Rootfile_parser(object):
             etabin=etabin)
         logger.debug(
             "Try to access %s in %s" % (hist_hash, self._rootfilename))
-        return self._rootfile.Get(hist_hash)
+        hist = self._pooled.rootfile.Get(hist_hash)
+        self._pooled.record(hist_hash, hist)
+        return hist
+
+
+    # returns bin edges, contents, upper and lower errors as float64 arrays reading the histogram only once
+    def get_arrays(self, variable, etabin):
+        return hist_arrays.get_arrays(self.get(variable, etabin))
 
+    # returns a dictionary with the arrays of get_arrays for each of the given eta bins
+    def get_arrays_batch(self, variable, etabins):
+        return dict((etabin, self.get_arrays(variable, etabin))
+                    for etabin in etabins)
 
     def get_bins(self, variable, etabin):
-        hist = self.get(self, variable, etabin)
-        nbins = hist.GetNbinsX()
-        bins = []
-        for i in range(nbins):
-            bins.append(hist.GetBinLowEdge(i + 1))
-        bins.append(hist.GetBinLowEdge(i + 1) + hist.GetBinWidth(i + 1))
-        return bins
+        return self.get_arrays(variable, etabin)[0].tolist()
 
     def get_values(self, variable, etabin):
-        hist = self.get(self, variable, etabin)
-        nbins = hist.GetNbinsX()
-        values = []
-        for i in range(nbins):
-            values.append(hist.GetBinContent(i + 1))
-        return values
+        return self.get_arrays(variable, etabin)[1].tolist()
 
     def get_values_up(self, variable, etabin):
-        hist = self.get(self, variable, etabin)
-        nbins=hist.GetNbinsX()
-        values=[]
-        for i in range(nbins):
-            values.append(hist.GetBinErrDown(i + 1))
-        return values
+        return self.get_arrays(variable, etabin)[2].tolist()
 
     def get_values_down(self, variable, etabin):
-        hist = self.get(self, variable, etabin)
-        nbins = hist.GetNbinsX()
-        values = []
-        for i in range(nbins):
-            values.append(hist.GetBinErrDown(i + 1))
-        return values
+        return self.get_arrays(variable, etabin)[3].tolist()
+
+    # releases the shared file handle, the file itself is closed via rootfile_pool
+    def close(self):
+        if self._pooled != None:
+            rootfile_pool.release(self._pooled)
+            self._pooled = None
 
     def __del__(self):
-        logger.debug("Closing rootfile %s" % (self._rootfilename))
-        self._rootfile.Close()
+        logger.debug("Releasing rootfile %s" % (self._rootfilename))
+        self.close()
+
+
+# opt-in instrumentation, see profiling.py
+profiling.instrument(ScaleFactor_Rootfile_parser, ["__init__", "get", "get_arrays", "get_arrays_batch"])
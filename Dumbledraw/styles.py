@@ -1,118 +1,147 @@
 import ROOT as R
 import logging
-import yaml
 from itertools import cycle
 logger = logging.getLogger(__name__)
 import os
 
-#loads the plot names from the text file into a list
-plot_names = list()
-data_file_names = open("data_plot_names.txt", "r")
-plot_names = [line.strip() for line in data_file_names.readlines() if line]
-data_file_names.close()
+import tables
+
+# The label, color and mass tables are loaded on first access, see tables.py. Importing this module does not read any file.
+legend_label_dict = tables.legend_label_dict
+x_label_dict = tables.x_label_dict
+mass_dict = tables.mass_dict
+labels_path = tables.labels_path
 
 COL_STORE = []
-labels_path = 'Dumbledraw/Dumbledraw/labels.yaml'
+# indices of the transparent colors by (base color, alpha), each pair is created only once per process
+_transparent_colors = {}
 
 
 def CreateTransparentColor(color, alpha):
+    key = (color, round(alpha, 6))
+    if key in _transparent_colors:
+        return _transparent_colors[key]
     adapt = R.gROOT.GetColor(color)
     new_idx = R.gROOT.GetListOfColors().GetLast() + 1
     trans = R.TColor(new_idx, adapt.GetRed(), adapt.GetGreen(),
                      adapt.GetBlue(), '', alpha)
     COL_STORE.append(trans)
     trans.SetName('userColor%i' % new_idx)
+    _transparent_colors[key] = new_idx
     return new_idx
 
 
-legend_label_dict = yaml.load(open(labels_path))['legend_label']
-x_label_dict = yaml.load(open(labels_path))['x_label']
-
-mass_dict= yaml.load(open("shapes/mass_dict_nmssm.yaml"), Loader=yaml.Loader)["plots"]
-
-
-color_dict = {
-    "data": R.TColor.GetColor(0,0,0),
-    "ggH": R.TColor.GetColor("#fed766"),
-    "qqH": R.TColor.GetColor("#2ab7ca"),
-    "ggH125": R.TColor.GetColor("#BF2229"),
-    "qqH125": R.TColor.GetColor("#00A88F"),
-    "HTT": R.TColor.GetColor("#00A88F"),
-    "VH": R.TColor.GetColor("#001EFF"),
-    "WH": R.TColor.GetColor("#001EFF"),
-    "ZH": R.TColor.GetColor("#001EFF"),
-    "ttH": R.TColor.GetColor("#FF00FF"),
-    "HWW": R.TColor.GetColor("#FF8C00"),
-    "ggH_hww": R.TColor.GetColor("#FF8C00"),
-    "qqH_hww": R.TColor.GetColor("#FF8C00"),
-    "dummy": R.TColor.GetColor(254, 74, 73),
-    "inclusive": R.TColor.GetColor(254, 74, 73),
-    "ZTT": R.TColor.GetColor(248, 206, 104),
-    "EMB": R.TColor.GetColor(248, 206, 104),
-    "ZLL": R.TColor.GetColor(100, 192, 232),
-    "ZL": R.TColor.GetColor(100, 192, 232),
-    "ZJ": R.TColor.GetColor("#64DE6A"),
-    "TT": R.TColor.GetColor(155, 152, 204),
-    "TTT": R.TColor.GetColor(155, 152, 204),
-    "TTL": R.TColor.GetColor(155, 152, 204),
-    "TTJ": R.TColor.GetColor(215, 130, 204),
-    "W": R.TColor.GetColor(222, 90, 106),
-    "WT": R.TColor.GetColor(222, 90, 106),
-    "WL": R.TColor.GetColor(222, 150, 80),
-    "VV": R.TColor.GetColor("#6F2D35"),
-    "VVT": R.TColor.GetColor("#6F2D35"),
-    "VVJ": R.TColor.GetColor("#c38a91"),
-    "VVL" : R.TColor.GetColor("#6F2D35"),
-    "ST": R.TColor.GetColor("#d0f0c1"),
-    "STT": R.TColor.GetColor("#d0f0c1"),
-    "STL" : R.TColor.GetColor("#d0f0c1"),
-    "QCD": R.TColor.GetColor(250, 202, 255),
-    "QCDEMB": R.TColor.GetColor(250, 202, 255),
-    "EWK": R.TColor.GetColor("#E1F5A9"),
-    "EWKT": R.TColor.GetColor("#E1F5A9"),
-    "EWKL": R.TColor.GetColor("#E1F5A9"),
-    "EWKJ": R.TColor.GetColor("#E1F5A9"),
-    "EWKZ": R.TColor.GetColor("#E1F5A9"),
-    "jetFakes": R.TColor.GetColor(192, 232, 100),
-    "jetFakesW": R.TColor.GetColor(222, 90, 106),
-    "jetFakesQCD": R.TColor.GetColor(250, 202, 255),
-    "jetFakesTT": R.TColor.GetColor(155, 152, 204),
-    "jetFakesEMB": R.TColor.GetColor(192, 232, 100),
-    "jetFakesCMB": R.TColor.GetColor(250, 202, 255),
-    "TotalBkg": R.TColor.GetColor(211,211,211),
-    "REST": R.TColor.GetColor("#B0C4DE"),
-    "unc": CreateTransparentColor(12, 0.4)
-
+# returns the number of transparent colors created by CreateTransparentColor and the size of the ROOT color list
+def color_registry_stats():
+    return {
+        "transparent": len(_transparent_colors),
+        "colors": R.gROOT.GetListOfColors().GetEntries()
+    }
+
+
+def _load_plot_names():
+    with open("data_plot_names.txt", "r") as data_file_names:
+        return [line.strip() for line in data_file_names.readlines() if line]
+
+
+#loads the plot names from the text file into a list on first use
+plot_names = tables.LazyList(_load_plot_names)
+
+
+def get_plot_names():
+    return plot_names
+
+
+# arguments of R.TColor.GetColor for the processes
+_process_colors = {
+    "data": (0,0,0),
+    "ggH": ("#fed766",),
+    "qqH": ("#2ab7ca",),
+    "ggH125": ("#BF2229",),
+    "qqH125": ("#00A88F",),
+    "HTT": ("#00A88F",),
+    "VH": ("#001EFF",),
+    "WH": ("#001EFF",),
+    "ZH": ("#001EFF",),
+    "ttH": ("#FF00FF",),
+    "HWW": ("#FF8C00",),
+    "ggH_hww": ("#FF8C00",),
+    "qqH_hww": ("#FF8C00",),
+    "dummy": (254, 74, 73),
+    "inclusive": (254, 74, 73),
+    "ZTT": (248, 206, 104),
+    "EMB": (248, 206, 104),
+    "ZLL": (100, 192, 232),
+    "ZL": (100, 192, 232),
+    "ZJ": ("#64DE6A",),
+    "TT": (155, 152, 204),
+    "TTT": (155, 152, 204),
+    "TTL": (155, 152, 204),
+    "TTJ": (215, 130, 204),
+    "W": (222, 90, 106),
+    "WT": (222, 90, 106),
+    "WL": (222, 150, 80),
+    "VV": ("#6F2D35",),
+    "VVT": ("#6F2D35",),
+    "VVJ": ("#c38a91",),
+    "VVL": ("#6F2D35",),
+    "ST": ("#d0f0c1",),
+    "STT": ("#d0f0c1",),
+    "STL": ("#d0f0c1",),
+    "QCD": (250, 202, 255),
+    "QCDEMB": (250, 202, 255),
+    "EWK": ("#E1F5A9",),
+    "EWKT": ("#E1F5A9",),
+    "EWKL": ("#E1F5A9",),
+    "EWKJ": ("#E1F5A9",),
+    "EWKZ": ("#E1F5A9",),
+    "jetFakes": (192, 232, 100),
+    "jetFakesW": (222, 90, 106),
+    "jetFakesQCD": (250, 202, 255),
+    "jetFakesTT": (155, 152, 204),
+    "jetFakesEMB": (192, 232, 100),
+    "jetFakesCMB": (250, 202, 255),
+    "TotalBkg": (211,211,211),
+    "REST": ("#B0C4DE",),
 }
 
-#creates different colors for the different run numbers
-if plot_names[0] != "data":
-    counter =0.0
-    for plot in plot_names:
-        counter+=1.0
-        if counter%2:
-            r=int(255.0-255.0*(counter/len(plot_names)))
-            b = int(255.0*(counter/len(plot_names)))
-            g = 0
-        else:
-            r=int(255.0-255.0*(counter/len(plot_names)))
-            g = int(255.0*(counter/len(plot_names)))
-            b = 20
-        color_dict[plot] = R.TColor.GetColor(r, g, b)
-
-
-i=0
-colors=["#8B008B", "#008a8a", "#8a0022", "#22008a","#8a8a00"]
-sig_colors=cycle(colors)
-for heavy_mass in mass_dict["heavy_mass"]:
-    light_masses = mass_dict["light_mass_coarse"] if heavy_mass > 1001 else mass_dict["light_mass_fine"]
-    for color in sig_colors:
-        if i<len(light_masses):
-            if light_masses[i]+125<heavy_mass:
-                color_dict["NMSSM_{heavy_mass}_125_{light_mass}".format(heavy_mass=heavy_mass,light_mass=light_masses[i])] = R.TColor.GetColor(color)
-                i+=1
-        else:
-            break
+
+def _load_colors():
+    colors = dict((name, R.TColor.GetColor(*args)) for name, args in _process_colors.items())
+    colors["unc"] = CreateTransparentColor(12, 0.4)
+
+    #creates different colors for the different run numbers
+    plot_names = get_plot_names()
+    if plot_names[0] != "data":
+        counter =0.0
+        for plot in plot_names:
+            counter+=1.0
+            if counter%2:
+                r=int(255.0-255.0*(counter/len(plot_names)))
+                b = int(255.0*(counter/len(plot_names)))
+                g = 0
+            else:
+                r=int(255.0-255.0*(counter/len(plot_names)))
+                g = int(255.0*(counter/len(plot_names)))
+                b = 20
+            colors[plot] = R.TColor.GetColor(r, g, b)
+
+    i=0
+    sig_colors=cycle(["#8B008B", "#008a8a", "#8a0022", "#22008a","#8a8a00"])
+    for heavy_mass in mass_dict["heavy_mass"]:
+        light_masses = mass_dict["light_mass_coarse"] if heavy_mass > 1001 else mass_dict["light_mass_fine"]
+        for color in sig_colors:
+            if i<len(light_masses):
+                if light_masses[i]+125<heavy_mass:
+                    colors["NMSSM_{heavy_mass}_125_{light_mass}".format(heavy_mass=heavy_mass,light_mass=light_masses[i])] = R.TColor.GetColor(color)
+                    i+=1
+            else:
+                break
+    return colors
+
+
+# color indices of the processes, created on first access
+color_dict = tables.LazyDict(_load_colors)
 
 def SetStyle(name, **kwargs):
     styles = {"none": none, "TDR": SetTDRStyle, "ModTDR": ModTDRStyle}
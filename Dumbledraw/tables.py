@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import logging
+import os
+import pickle
+import yaml
+try:
+    from collections.abc import MutableMapping, MutableSequence
+except ImportError:  # python 2
+    from collections import MutableMapping, MutableSequence
+logger = logging.getLogger(__name__)
+
+# Lazily loaded lookup tables (labels, colors, mass points). Nothing is read at import time, each file is parsed once per process.
+# If a cache directory is set (see set_cache_dir or the environment variable DUMBLEDRAW_TABLE_CACHE), parsed YAML files are also stored as pickle files,
+# which are used as long as modification time and size of the YAML file are unchanged.
+
+labels_path = 'Dumbledraw/Dumbledraw/labels.yaml'
+mass_dict_path = "shapes/mass_dict_nmssm.yaml"
+
+_parsed = {}
+_cache_dir = [os.environ.get("DUMBLEDRAW_TABLE_CACHE")]
+
+# the C implementation of the YAML parser is much faster, but not available in all installations
+_yaml_loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def set_cache_dir(directory):
+    _cache_dir[0] = directory
+
+
+def _cache_path(path):
+    return os.path.join(_cache_dir[0], hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest() + ".pkl")
+
+
+def _read_cache(path, fingerprint):
+    try:
+        with open(_cache_path(path), "rb") as cachefile:
+            cached_fingerprint, content = pickle.load(cachefile)
+    except Exception:
+        return None
+    if cached_fingerprint != fingerprint:
+        return None
+    return content
+
+
+def _write_cache(path, fingerprint, content):
+    try:
+        if not os.path.isdir(_cache_dir[0]):
+            os.makedirs(_cache_dir[0])
+        # written atomically, since several workers may write the same file
+        tmp_path = "%s.%i.tmp" % (_cache_path(path), os.getpid())
+        with open(tmp_path, "wb") as cachefile:
+            pickle.dump((fingerprint, content), cachefile, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_path, _cache_path(path))
+    except (IOError, OSError) as error:
+        logger.warning("Cannot write table cache for %s: %s" % (path, error))
+
+
+# returns the content of a YAML file, which is parsed only once per process
+def load_yaml(path):
+    if not path in _parsed:
+        content = None
+        if _cache_dir[0] != None:
+            status = os.stat(path)
+            fingerprint = (status.st_mtime, status.st_size)
+            content = _read_cache(path, fingerprint)
+        if content == None:
+            logger.debug("Parsing %s" % path)
+            with open(path) as yamlfile:
+                content = yaml.load(yamlfile, Loader=_yaml_loader)
+            if _cache_dir[0] != None:
+                _write_cache(path, fingerprint, content)
+        _parsed[path] = content
+    return _parsed[path]
+
+
+# dictionary, which is filled by the given function on first access
+class LazyDict(MutableMapping):
+    def __init__(self, loader):
+        self._loader = loader
+        self._table = None
+
+    @property
+    def loaded(self):
+        return self._table != None
+
+    def _get_table(self):
+        if self._table == None:
+            self._table = self._loader()
+        return self._table
+
+    def __getitem__(self, key):
+        return self._get_table()[key]
+
+    def __setitem__(self, key, value):
+        self._get_table()[key] = value
+
+    def __delitem__(self, key):
+        del self._get_table()[key]
+
+    def __iter__(self):
+        return iter(self._get_table())
+
+    def __len__(self):
+        return len(self._get_table())
+
+    def __contains__(self, key):
+        return key in self._get_table()
+
+
+# dictionary with fixed entries, which are extended by the entries returned by the given function only if a missing key is accessed
+# or all entries are needed, e.g. the process maps of the inputshapes parser, which need the mass dict only for the NMSSM signals
+class ExtendedDict(LazyDict):
+    def __init__(self, base, extension):
+        LazyDict.__init__(self, self._load)
+        self._base = base
+        self._extension = extension
+
+    def _load(self):
+        table = dict(self._base)
+        table.update(self._extension())
+        return table
+
+    def __getitem__(self, key):
+        if self._table == None and key in self._base:
+            return self._base[key]
+        return LazyDict.__getitem__(self, key)
+
+    def __contains__(self, key):
+        if self._table == None and key in self._base:
+            return True
+        return LazyDict.__contains__(self, key)
+
+
+# list, which is filled by the given function on first access
+class LazyList(MutableSequence):
+    def __init__(self, loader):
+        self._loader = loader
+        self._table = None
+
+    @property
+    def loaded(self):
+        return self._table != None
+
+    def _get_table(self):
+        if self._table == None:
+            self._table = list(self._loader())
+        return self._table
+
+    def __getitem__(self, index):
+        return self._get_table()[index]
+
+    def __setitem__(self, index, value):
+        self._get_table()[index] = value
+
+    def __delitem__(self, index):
+        del self._get_table()[index]
+
+    def __len__(self):
+        return len(self._get_table())
+
+    def insert(self, index, value):
+        self._get_table().insert(index, value)
+
+
+legend_label_dict = LazyDict(lambda: load_yaml(labels_path)['legend_label'])
+x_label_dict = LazyDict(lambda: load_yaml(labels_path)['x_label'])
+mass_dict = LazyDict(lambda: load_yaml(mass_dict_path)["plots"])
+
+
+# returns the names of the NMSSM signals with heavy mass, light mass pairs of the mass_dict
+def nmssm_mass_points():
+    points = []
+    for heavy_mass in mass_dict["heavy_mass"]:
+        light_masses = mass_dict["light_mass_coarse"] if heavy_mass > 1001 else mass_dict["light_mass_fine"]
+        for light_mass in light_masses:
+            if light_mass + 125 < heavy_mass:
+                points.append((heavy_mass, light_mass))
+    return points
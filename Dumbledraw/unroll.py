@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import numpy as np
+import ROOT as R
+logger = logging.getLogger(__name__)
+
+import hist_arrays
+
+# Unrolling of two dimensional distributions into one dimensional histograms as expected by Subplot.unroll.
+# The bins of the inner axis are placed slice by slice along the x axis. Slice k covers the range of the inner axis shifted by k times its width,
+# so that the tick labels drawn by Subplot.DrawUnrolled show the values of the inner axis, e.g.
+#
+# hist, labels, selection = unroll.unroll_hist(th2, slice_name="p_{T}", selection=[1, 2, 3])
+# plot.add_hist(hist, "ZTT", "bkg")
+# plot.unroll(labels, selection=selection)
+
+
+# returns the label of a slice, e.g. "20 < p_{T} < 40"
+def slice_label(low, high, slice_name="", label_format="{low:g} < {name} < {high:g}"):
+    return label_format.format(low=low, high=high, name=slice_name)
+
+
+# returns the (nslices, ninner) arrays of contents and squared weights of a TH2 without under- and overflow bins.
+# With slice_axis="y" each slice contains the x bins of a single y bin.
+def read_th2(hist, slice_axis="y"):
+    nx = hist.GetNbinsX()
+    ny = hist.GetNbinsY()
+    contents = hist_arrays.get_contents(hist)
+    sumw2 = hist_arrays.get_sumw2(hist, contents)
+    # the cells of a TH2 are ordered as x + (nx + 2) * y
+    contents = contents.reshape((ny + 2, nx + 2))[1:-1, 1:-1]
+    sumw2 = sumw2.reshape((ny + 2, nx + 2))[1:-1, 1:-1]
+    xedges = hist_arrays.get_edges(hist, "x")
+    yedges = hist_arrays.get_edges(hist, "y")
+    if slice_axis == "y":
+        return contents, sumw2, xedges, yedges
+    elif slice_axis == "x":
+        return contents.T, sumw2.T, yedges, xedges
+    logger.fatal("Slice axis has to be x or y, got %s!" % slice_axis)
+    raise Exception
+
+
+# returns the edges of the unrolled axis for the given number of slices
+def unrolled_edges(inner_edges, nslices):
+    width = inner_edges[-1] - inner_edges[0]
+    edges = inner_edges[:-1][np.newaxis, :] + width * np.arange(nslices)[:, np.newaxis]
+    return np.append(edges.ravel(), inner_edges[0] + width * nslices)
+
+
+# unrolls a two dimensional array of shape (nslices, ninner) into a TH1D. Only the selected slices are copied into the histogram, so
+# the returned labels and selection refer to the selected slices and can be passed to Plot.unroll or Subplot.unroll directly.
+def unroll_array(contents,
+                 inner_edges,
+                 slice_edges,
+                 sumw2=None,
+                 name="unrolled",
+                 title="",
+                 selection=None,
+                 slice_name="",
+                 label_format="{low:g} < {name} < {high:g}"):
+    contents = np.asarray(contents, dtype=np.float64)
+    inner_edges = np.asarray(inner_edges, dtype=np.float64)
+    slice_edges = np.asarray(slice_edges, dtype=np.float64)
+    if contents.ndim != 2 or contents.shape != (len(slice_edges) - 1, len(inner_edges) - 1):
+        logger.fatal(
+            "Shape {} of the contents does not match {} slices with {} bins!".format(
+                contents.shape, len(slice_edges) - 1, len(inner_edges) - 1))
+        raise Exception
+    if sumw2 is None:
+        sumw2 = np.abs(contents)
+    else:
+        sumw2 = np.asarray(sumw2, dtype=np.float64)
+    if selection is None:
+        selection = range(contents.shape[0])
+    selection = list(selection)
+    if len(selection) == 0:
+        logger.fatal("No slices selected for unrolling!")
+        raise Exception
+
+    # the selected slices are contiguous in the unrolled histogram, with empty under- and overflow bins
+    nbins = len(selection) * contents.shape[1]
+    edges = unrolled_edges(inner_edges, len(selection))
+    cells = np.zeros(nbins + 2, dtype=np.float64)
+    cells[1:-1] = contents[selection].ravel()
+    cells_sumw2 = np.zeros(nbins + 2, dtype=np.float64)
+    cells_sumw2[1:-1] = sumw2[selection].ravel()
+
+    hist = R.TH1D(name, title, nbins, edges)
+    hist.SetDirectory(0)
+    hist.Sumw2()
+    hist.SetContent(cells)
+    hist.GetSumw2().Set(nbins + 2, cells_sumw2)
+    labels = [
+        slice_label(slice_edges[i], slice_edges[i + 1], slice_name, label_format)
+        for i in selection
+    ]
+    return hist, labels, range(len(selection))
+
+
+# unrolls a TH2 into a TH1D, see unroll_array. The slice name defaults to the title of the slice axis.
+def unroll_hist(hist,
+                name=None,
+                slice_axis="y",
+                selection=None,
+                slice_name=None,
+                label_format="{low:g} < {name} < {high:g}"):
+    if not isinstance(hist, R.TH2):
+        logger.fatal("unroll_hist expects a TH2, got object {}".format(hist))
+        raise Exception
+    contents, sumw2, inner_edges, slice_edges = read_th2(hist, slice_axis)
+    if name == None:
+        name = hist.GetName() + "_unrolled"
+    if slice_name == None:
+        axis = hist.GetYaxis() if slice_axis == "y" else hist.GetXaxis()
+        slice_name = axis.GetTitle()
+    return unroll_array(
+        contents,
+        inner_edges,
+        slice_edges,
+        sumw2=sumw2,
+        name=name,
+        title=hist.GetTitle(),
+        selection=selection,
+        slice_name=slice_name,
+        label_format=label_format)
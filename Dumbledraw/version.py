@@ -0,0 +1,5 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# part of the key of cached plots, increase whenever the rendering changes
+__version__ = "0.2.0"
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import time
+logger = logging.getLogger(__name__)
+
+import hist_arrays
+import rootfile_pool
+
+# Incremental re-rendering of plot specs while their input files are regenerated, e.g.
+#
+# watcher = watch.Watcher(specs, spec_paths, nprocesses=4)
+# watcher.run()
+#
+# The content hashes of the histograms read for each plot are recorded via rootfile_pool.start_recording at the time they are read.
+# When an input file has changed (and its modification time and size are stable for one polling interval), the recorded histograms of
+# this file are hashed again and only the plots which read a histogram with different contents are rendered again.
+# Plots whose spec file changed are rendered again as well.
+# The plotting modules are imported when plots are rendered, the bookkeeping of the watcher does not need ROOT.
+
+
+# render function for campaign.run_campaign, which returns the written files and the (file, key, content hash) of the histograms read for the plot
+class WatchRenderer(object):
+    def __init__(self, cache=None):
+        self._cache = cache
+
+    def __call__(self, spec):
+        import plotspec
+        recorder = rootfile_pool.start_recording()
+        try:
+            outputs = plotspec.render(spec, cache=self._cache)
+        finally:
+            rootfile_pool.stop_recording(recorder)
+        return {"outputs": outputs, "keys": sorted([[path, key, digest] for (path, key), digest in recorder.items()])}
+
+
+def _fingerprint(path):
+    try:
+        status = os.stat(path)
+    except OSError:  # removed, e.g. while it is rewritten
+        return None
+    return (status.st_mtime, status.st_size)
+
+
+# returns the content hashes of the histograms with given keys of a file, missing histograms have the hash None
+def hash_keys(path, keys):
+    pooled = rootfile_pool.acquire(path)
+    try:
+        return dict((key, hist_arrays.content_hash(pooled.rootfile.Get(key))) for key in keys)
+    finally:
+        rootfile_pool.release(pooled)
+
+
+class Watcher(object):
+    def __init__(self,
+                 specs,
+                 spec_paths=None,
+                 nprocesses=1,
+                 style="ModTDR",
+                 style_kwargs=None,
+                 cache=None,
+                 interval=1.):
+        self._specs = list(specs)
+        self._spec_paths = spec_paths
+        self._nprocesses = nprocesses
+        self._style = style
+        self._style_kwargs = style_kwargs
+        self._renderer = WatchRenderer(cache)
+        self._interval = interval
+        # content hashes of the histograms read by each spec as they were read, by (file, key)
+        self._keys = [{} for spec in self._specs]
+        # fingerprints of the files when they were last read, and of changed files which are not yet stable
+        self._fingerprints = {}
+        self._pending = {}
+        self._nrendered = 0
+
+    @property
+    def nrendered(self):
+        return self._nrendered
+
+    def _input_file(self, i):
+        return os.path.abspath(self._specs[i]["input"]["file"])
+
+    def _files(self):
+        files = set([path for keys in self._keys for path, key in keys])
+        files.update([self._input_file(i) for i in range(len(self._specs))])
+        if self._spec_paths != None:
+            files.update(self._spec_paths)
+        return files
+
+    # renders the specs with given indices, updates the recorded hashes and returns the campaign results
+    def render(self, indices):
+        import campaign
+        indices = list(indices)
+        # taken before the inputs are read, so that changes during the rendering are detected by the next update
+        for path in self._files():
+            if not path in self._fingerprints:
+                self._fingerprints[path] = _fingerprint(path)
+        results = campaign.run_campaign(
+            self._renderer, [self._specs[i] for i in indices],
+            nprocesses=min(self._nprocesses, len(indices)),
+            style=self._style,
+            style_kwargs=self._style_kwargs)
+        for i, result in zip(indices, results):
+            if result["error"] != None:
+                # the hashes of the last successful rendering are kept, so that the plot is retried on the next change of its inputs
+                logger.error("Failed to render spec %i" % i)
+                continue
+            self._keys[i] = dict(((path, key), digest) for path, key, digest in result["result"]["keys"])
+            self._nrendered += 1
+        # files which were not known before the rendering are compared on the next update
+        for path in self._files():
+            if not path in self._fingerprints:
+                self._fingerprints[path] = None
+        return results
+
+    # returns the files which changed since they were last read and whose fingerprint did not change during the last interval
+    def _changed_files(self):
+        changed = []
+        for path in self._files():
+            fingerprint = _fingerprint(path)
+            if fingerprint == self._fingerprints.get(path):
+                self._pending.pop(path, None)
+            elif fingerprint != None and self._pending.get(path) == fingerprint:
+                self._pending.pop(path)
+                self._fingerprints[path] = fingerprint
+                changed.append(path)
+            else:
+                self._pending[path] = fingerprint
+        return changed
+
+    # checks the inputs once and renders the affected specs again, returns the indices of the rendered specs
+    def update(self):
+        changed_files = self._changed_files()
+        if len(changed_files) == 0:
+            return []
+        affected = set()
+        for path in changed_files:
+            if self._spec_paths != None and path in self._spec_paths:
+                for i, spec_path in enumerate(self._spec_paths):
+                    if spec_path == path:
+                        import plotspec
+                        self._specs[i] = plotspec.load_spec(spec_path)
+                        affected.add(i)
+                continue
+            # the file may have been rewritten in place, so the handle of the pool must not be reused
+            rootfile_pool.close(path, force=True)
+            keys = set([key for spec_keys in self._keys for file_path, key in spec_keys if file_path == path])
+            hashes = hash_keys(path, keys)
+            nchanged = 0
+            for i, spec_keys in enumerate(self._keys):
+                changed = [key for file_path, key in spec_keys if file_path == path and spec_keys[(file_path, key)] != hashes[key]]
+                nchanged += len(changed)
+                # specs which never rendered successfully are retried on any change of their input file
+                if len(changed) > 0 or (len(spec_keys) == 0 and self._input_file(i) == path):
+                    affected.add(i)
+            logger.info("%s changed, %i recorded histograms differ" % (path, nchanged))
+        affected = sorted(affected)
+        if len(affected) > 0:
+            logger.info("Rendering %i of %i plots again" % (len(affected), len(self._specs)))
+            self.render(affected)
+        return affected
+
+    # renders all specs and then watches the inputs until interrupted or max_updates checks have been done
+    def run(self, max_updates=None):
+        self.render(range(len(self._specs)))
+        nupdates = 0
+        try:
+            while max_updates == None or nupdates < max_updates:
+                time.sleep(self._interval)
+                self.update()
+                nupdates += 1
+        except KeyboardInterrupt:
+            logger.info("Stopped watching after rendering %i plots" % self._nrendered)
+        rootfile_pool.close_all()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Dumbledraw.dumbledraw as dd
+import Dumbledraw.rootfile_parser as rootfile_parser
+import Dumbledraw.rootfile_parser_inputshapes as rootfile_parser_inputshapes
+import Dumbledraw.sf_rootfile_parser as sf_rootfile_parser
+import Dumbledraw.rootfile_pool as rootfile_pool
+import Dumbledraw.styles as styles
+from Dumbledraw.version import __version__
+import synthetic
+
+import argparse
+import json
+import platform
+import resource
+import shutil
+import tempfile
+import time
+
+import logging
+logger = logging.getLogger("")
+
+_processes = ["ZTT", "ZL", "ZJ", "TTT", "TTJ", "VVT", "W", "QCD", "EWK", "ggH", "qqH", "data_obs"]
+_inputshapes_processes = ["ZTT", "ZL", "ZJ", "TTT", "TTL", "TTJ", "VVT", "VVL", "VVJ", "W", "QCD", "EMB"]
+
+
+def setup_logging(level=logging.INFO):
+    logger.setLevel(level)
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(name)s - %(levelname)s - %(message)s"))
+    logger.addHandler(handler)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Dumbledraw parsers and plotting on synthetic input files.")
+    parser.add_argument("--output", default="benchmark_results.json", type=str,
+                        help="JSON file the results are written to.")
+    parser.add_argument("--workdir", default=None, type=str,
+                        help="Directory for the synthetic files and plots, a temporary directory is used and removed if not given.")
+    parser.add_argument("--channels", default=2, type=int, help="Number of channels.")
+    parser.add_argument("--categories", default=4, type=int, help="Number of categories per channel.")
+    parser.add_argument("--processes", default=len(_processes), type=int,
+                        help="Number of processes (at most %i)." % len(_processes))
+    parser.add_argument("--systematics", default=10, type=int, help="Number of systematic shifts per process.")
+    parser.add_argument("--bins", default=20, type=int, help="Number of bins per unrolled slice.")
+    parser.add_argument("--slices", default=5, type=int, help="Number of unrolled slices.")
+    parser.add_argument("--repeat", default=5, type=int, help="Number of repetitions of each benchmark.")
+    return parser.parse_args()
+
+
+# resident set size of the process in MB, current and peak
+def _rss():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+    try:
+        with open("/proc/self/statm") as statm:
+            current = int(statm.read().split()[1]) * resource.getpagesize() / 1024.**2
+    except IOError:
+        current = None
+    return current, peak
+
+
+# runs function repeat times and returns the timing statistics in seconds and the memory used by the benchmark.
+# With setup, only function(setup()) is timed and the object returned by setup is passed to teardown afterwards.
+# rss_delta_mb is the growth of the RSS during the benchmark and rss_peak_growth_mb the increase of the peak RSS of the process,
+# which is only non-zero for benchmarks needing more memory than all benchmarks before.
+def measure(name, function, repeat, setup=None, teardown=None):
+    rss_before, rss_peak_before = _rss()
+    times = []
+    for i in range(repeat):
+        state = setup() if setup != None else None
+        start = time.time()
+        if setup != None:
+            function(state)
+        else:
+            function()
+        times.append(time.time() - start)
+        if teardown != None:
+            teardown(state)
+    rss, rss_peak = _rss()
+    result = {
+        "name": name,
+        "repeat": repeat,
+        "min": min(times),
+        "mean": sum(times) / len(times),
+        "max": max(times),
+        "rss_mb": rss,
+        "rss_delta_mb": rss - rss_before if rss != None and rss_before != None else None,
+        "rss_peak_mb": rss_peak,
+        "rss_peak_growth_mb": rss_peak - rss_peak_before
+    }
+    logger.info("%-30s min %8.4f s  mean %8.4f s  RSS growth %7.1f MB" %
+                (name, result["min"], result["mean"], result["rss_delta_mb"] if result["rss_delta_mb"] != None else 0.))
+    return result
+
+
+def main(args):
+    workdir = args.workdir if args.workdir != None else tempfile.mkdtemp(prefix="dumbledraw_benchmark_")
+    if not os.path.exists(workdir):
+        os.makedirs(workdir)
+    channels = ["ch%i" % i for i in range(args.channels)]
+    categories = ["cat%i" % i for i in range(args.categories)]
+    processes = _processes[:args.processes]
+    systematics = ["syst%i" % i for i in range(args.systematics)]
+    nbins = args.bins * args.slices
+    results = []
+
+    # synthetic inputs, the mass dict of the NMSSM signals in the process maps of the inputshapes parser is written as well
+    rootfile_parser_inputshapes.tables.mass_dict_path = synthetic.write_mass_dict(os.path.join(workdir, "mass_dict_nmssm.yaml"))
+    ch_path = os.path.join(workdir, "combine_harvester.root")
+    is_path = os.path.join(workdir, "inputshapes.root")
+    sf_path = os.path.join(workdir, "scale_factors.root")
+    results.append(measure("write_files", lambda: (
+        synthetic.write_combine_harvester_file(ch_path, channels, categories, processes, systematics, nbins),
+        synthetic.write_inputshapes_file(is_path, channels, categories, _inputshapes_processes,
+                                         ["Nominal"] + ["%s%s" % (syst, shift) for syst in systematics for shift in ["Up", "Down"]],
+                                         "m_vis", nbins),
+        synthetic.write_sf_file(sf_path, ["pt"], 10 * args.categories, nbins)), 1))
+
+    # parsers, the files are closed after each repetition to include opening and indexing
+    def read_combine_harvester():
+        parser = rootfile_parser.Rootfile_parser(ch_path, "CombineHarvester")
+        for channel in channels:
+            for category in categories:
+                for process in processes:
+                    parser.get("2016", channel, category, process)
+                    for syst in systematics:
+                        parser.get("2016", channel, category, process, syst + "Up")
+        parser.close()
+        rootfile_pool.close_all()
+
+    def read_combine_harvester_many():
+        parser = rootfile_parser.Rootfile_parser(ch_path, "CombineHarvester")
+        parser.get_many(["2016"], channels, categories, processes, [None] + [syst + "Up" for syst in systematics])
+        parser.close()
+        rootfile_pool.close_all()
+
+    def read_values():
+        parser = rootfile_parser.Rootfile_parser(ch_path, "CombineHarvester")
+        for channel in channels:
+            for category in categories:
+                for process in processes:
+                    parser.get_values("2016", channel, category, process)
+        parser.close()
+        rootfile_pool.close_all()
+
+    def read_inputshapes():
+        parser = rootfile_parser_inputshapes.Rootfile_parser(is_path, "m_vis")
+        parser.get_many(channels, _inputshapes_processes, categories,
+                        ["Nominal"] + [syst + "Up" for syst in systematics])
+        parser.close()
+        rootfile_pool.close_all()
+
+    def read_sf():
+        parser = sf_rootfile_parser.ScaleFactor_Rootfile_parser(sf_path)
+        parser.get_arrays_batch("pt", range(10 * args.categories))
+        parser.close()
+        rootfile_pool.close_all()
+
+    results.append(measure("Rootfile_parser.get", read_combine_harvester, args.repeat))
+    results.append(measure("Rootfile_parser.get_many", read_combine_harvester_many, args.repeat))
+    results.append(measure("Rootfile_parser.get_values", read_values, args.repeat))
+    results.append(measure("inputshapes.get_many", read_inputshapes, args.repeat))
+    results.append(measure("sf.get_arrays_batch", read_sf, args.repeat))
+
+    # plot building, drawing and saving of a single category
+    parser = rootfile_parser.Rootfile_parser(ch_path, "CombineHarvester")
+    hists = [parser.get("2016", channels[0], categories[0], process) for process in processes]
+    bkg_processes = [process for process in processes if process != "data_obs"]
+    styles.SetStyle("ModTDR", r=0.04, l=0.14)
+    labels = ["slice %i" % i for i in range(args.slices)]
+
+    def build_plot():
+        plot = dd.Plot([0.35], "none")
+        for process, hist in zip(processes, hists):
+            plot.add_hist(hist, process, "bkg" if process in bkg_processes else "invisible")
+        return plot
+
+    def add_hists():
+        build_plot().close()
+
+    def stacked_plot():
+        plot = build_plot()
+        plot.create_stack(bkg_processes, "stack")
+        return plot
+
+    def unrolled_plot():
+        plot = stacked_plot()
+        plot.unroll(labels)
+        return plot
+
+    def drawn_plot():
+        plot = stacked_plot()
+        plot.subplot(0).Draw(["stack", processes[-1]])
+        return plot
+
+    def close(plot):
+        plot.close()
+
+    results.append(measure("Plot (construction and add_hist)", add_hists, args.repeat))
+    results.append(measure("Plot.create_stack", lambda plot: plot.create_stack(bkg_processes, "stack"), args.repeat,
+                           build_plot, close))
+    results.append(measure("Subplot.normalize", lambda plot: plot.subplot(1).normalize(processes, "bkg"), args.repeat,
+                           build_plot, close))
+    results.append(measure("Subplot.DrawUnrolled", lambda plot: plot.subplot(0).DrawUnrolled(["stack", processes[-1]]),
+                           args.repeat, unrolled_plot, close))
+    for extension in ["png", "pdf"]:
+        results.append(measure("Plot.save (%s)" % extension,
+                               lambda plot, extension=extension: plot.save(os.path.join(workdir, "benchmark.%s" % extension)),
+                               args.repeat, drawn_plot, close))
+    results.append(measure("Plot.save_all (png, pdf)",
+                           lambda plot: plot.save_all(os.path.join(workdir, "benchmark"), ["png", "pdf"]),
+                           args.repeat, drawn_plot, close))
+    parser.close()
+    rootfile_pool.close_all()
+
+    rss, rss_peak = _rss()
+    output = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": vars(args),
+        "rss_peak_mb": rss_peak,
+        "benchmarks": results
+    }
+    with open(args.output, "w") as outputfile:
+        json.dump(output, outputfile, indent=2, sort_keys=True)
+    logger.info("Wrote results to %s" % args.output)
+    if args.workdir == None:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    setup_logging()
+    main(args)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import yaml
+import ROOT as R
+
+# Writers of synthetic input files in the layouts read by the Dumbledraw parsers. The contents are random but reproducible (fixed seed).
+
+
+def _fill(hist, rng, scale):
+    nbins = hist.GetNbinsX()
+    contents = rng.exponential(scale, nbins)
+    for i in range(nbins):
+        hist.SetBinContent(i + 1, contents[i])
+        hist.SetBinError(i + 1, np.sqrt(contents[i]))
+
+
+def _book(name, nbins, rng, scale=100.):
+    hist = R.TH1F(name, name, nbins, 0., 1.)
+    hist.SetDirectory(0)
+    _fill(hist, rng, scale)
+    return hist
+
+
+# CombineHarvester shapes: one directory htt_<channel>_<category>_<era> per category with the nominal and systematic shapes of all processes.
+# nbins may be a multiple of the number of unrolled slices.
+def write_combine_harvester_file(path, channels, categories, processes, systematics, nbins, era="2016", seed=1):
+    rng = np.random.RandomState(seed)
+    rootfile = R.TFile(path, "RECREATE")
+    for channel in channels:
+        for category in categories:
+            directory = rootfile.mkdir("htt_%s_%s_%s" % (channel, category, era))
+            directory.cd()
+            for process in processes:
+                _book(process, nbins, rng).Write()
+                for syst in systematics:
+                    for shift in ["Up", "Down"]:
+                        _book("%s_%s%s" % (process, syst, shift), nbins, rng).Write()
+    rootfile.Close()
+
+
+# small mass dict of NMSSM signals in the layout of shapes/mass_dict_nmssm.yaml, which is not part of the repository
+def write_mass_dict(path):
+    with open(path, "w") as massfile:
+        yaml.safe_dump({"plots": {"heavy_mass": [500, 1000], "light_mass_fine": [60, 100], "light_mass_coarse": [60]}}, massfile)
+    return path
+
+
+# shapes as produced by the shape producer: flat keys dataset#channel-category-process#shape_type#variable
+def write_inputshapes_file(path, channels, categories, processes, shape_types, variable, nbins, seed=2):
+    import Dumbledraw.rootfile_parser_inputshapes as rootfile_parser_inputshapes
+    parser = rootfile_parser_inputshapes.Rootfile_parser
+    rng = np.random.RandomState(seed)
+    rootfile = R.TFile(path, "RECREATE")
+    for channel in channels:
+        for category in categories:
+            for process in processes:
+                for shape_type in shape_types:
+                    name = "{dataset}#{channel}-{category}-{process}#{shape_type}#{variable}".format(
+                        dataset=parser._dataset_map[process],
+                        channel=channel,
+                        category=category,
+                        process=parser._process_map[process],
+                        shape_type=shape_type,
+                        variable=variable)
+                    _book(name, nbins, rng).Write()
+    rootfile.Close()
+
+
+# scale factor files: one histogram <variable>_projx_<etabin> per eta bin
+def write_sf_file(path, variables, netabins, nbins, seed=3):
+    rng = np.random.RandomState(seed)
+    rootfile = R.TFile(path, "RECREATE")
+    for variable in variables:
+        for etabin in range(netabins):
+            hist = _book("%s_projx_%i" % (variable, etabin), nbins, rng, 1.)
+            hist.Write()
+    rootfile.Close()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import Dumbledraw.array_cache as array_cache
+
+import argparse
+import os
+
+import logging
+logger = logging.getLogger("")
+
+
+def setup_logging(level=logging.INFO):
+    logger.setLevel(level)
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(name)s - %(levelname)s - %(message)s"))
+    logger.addHandler(handler)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Export the histograms of shape files to the memory mapped array cache read by the Dumbledraw parsers.")
+    parser.add_argument("files", nargs="+", type=str, help="ROOT files to export.")
+    parser.add_argument(
+        "--cache-dir",
+        default=os.environ.get("DUMBLEDRAW_ARRAY_CACHE"),
+        type=str,
+        help="Cache directory, defaults to the environment variable DUMBLEDRAW_ARRAY_CACHE.")
+    parser.add_argument("--force", action="store_true", help="Export the files even if their cache is up to date.")
+    return parser.parse_args()
+
+
+def main(args):
+    if args.cache_dir == None:
+        logger.fatal("No cache directory given!")
+        raise Exception
+    if not os.path.isdir(args.cache_dir):
+        os.makedirs(args.cache_dir)
+    for filename in args.files:
+        if not args.force and array_cache.load(filename, args.cache_dir, build=False) != None:
+            logger.info("Array cache of %s is up to date" % filename)
+            continue
+        array_cache.export(filename, args.cache_dir)
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    setup_logging()
+    main(args)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import Dumbledraw.render_cache as render_cache
+import Dumbledraw.render_server as render_server
+
+import argparse
+import sys
+
+import logging
+logger = logging.getLogger("")
+
+
+def setup_logging(output_file, level=logging.DEBUG):
+    logger.setLevel(level)
+    formatter = logging.Formatter("%(name)s - %(levelname)s - %(message)s")
+
+    # stdout is used for the responses
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+    file_handler = logging.FileHandler(output_file, "w")
+    file_handler.setFormatter(formatter)
+    logger.addHandler(file_handler)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Render plot specs sent as JSON lines via stdin or a unix socket, keeping ROOT, style and input files loaded.")
+    parser.add_argument(
+        "--socket",
+        default=None,
+        type=str,
+        help="Path of the unix socket to listen on. Requests are read from stdin if not given.")
+    parser.add_argument(
+        "--style",
+        default="ModTDR",
+        type=str,
+        help="Plotting style set once at startup.")
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        type=str,
+        help="Skip plots whose inputs and spec did not change since they were rendered, using the keys stored in this directory.")
+    return parser.parse_args()
+
+
+def main(args):
+    cache = None if args.cache_dir == None else render_cache.RenderCache(args.cache_dir)
+    server = render_server.RenderServer(style=args.style, cache=cache)
+    if args.socket == None:
+        server.serve_lines(sys.stdin, sys.stdout)
+        server.reload()
+    else:
+        server.serve_socket(args.socket)
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    setup_logging("plot_server.log", logging.INFO)
+    main(args)
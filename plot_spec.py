@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import Dumbledraw.campaign as campaign
+import Dumbledraw.plotspec as plotspec
+import Dumbledraw.render_cache as render_cache
+import Dumbledraw.rootfile_pool as rootfile_pool
+import Dumbledraw.watch as watch
+
+import argparse
+
+import logging
+logger = logging.getLogger("")
+
+
+def setup_logging(output_file, level=logging.DEBUG):
+    logger.setLevel(level)
+    formatter = logging.Formatter("%(name)s - %(levelname)s - %(message)s")
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+    file_handler = logging.FileHandler(output_file, "w")
+    file_handler.setFormatter(formatter)
+    logger.addHandler(file_handler)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Produce plots from declarative YAML or JSON plot specs.")
+    parser.add_argument(
+        "specs",
+        nargs='+',
+        type=str,
+        help="Plot spec files, see Dumbledraw/plotspec.py for the format.")
+    parser.add_argument(
+        "--style",
+        default="ModTDR",
+        type=str,
+        help="Plotting style set once per worker process.")
+    parser.add_argument(
+        "--num-processes",
+        default=1,
+        type=int,
+        help="Number of worker processes used to produce the plots.")
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        type=str,
+        help="Skip plots whose inputs and spec did not change since they were rendered, using the keys stored in this directory.")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running after the plots are rendered and render the plots again whose input histograms or spec files change.")
+    parser.add_argument(
+        "--interval",
+        default=1.,
+        type=float,
+        help="Polling interval of the input files in seconds in watch mode.")
+    return parser.parse_args()
+
+
+def main(args):
+    specs = [plotspec.load_spec(path) for path in args.specs]
+    cache = None if args.cache_dir == None else render_cache.RenderCache(args.cache_dir)
+    if args.watch:
+        watcher = watch.Watcher(specs, args.specs, nprocesses=args.num_processes, style=args.style, cache=cache,
+                                interval=args.interval)
+        watcher.run()
+        return
+    results = campaign.run_campaign(
+        plotspec.Renderer(cache), specs, nprocesses=args.num_processes, style=args.style)
+    for path, result in zip(args.specs, results):
+        if result["error"] != None:
+            logger.error("Failed to render %s" % path)
+        else:
+            logger.info("Rendered %s in %.2f s" % (path, result["time"]))
+    rootfile_pool.close_all()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    setup_logging("plot_spec.log", logging.INFO)
+    main(args)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+
+import numpy as np
+
+import array_cache
+
+
+# writes the cache of a single histogram d/h of the source file as array_cache.export would
+def _write_cache(source, cache_dir, contents):
+    path = array_cache._cache_path(source, cache_dir)
+    os.makedirs(path)
+    np.save(os.path.join(path, "edges.npy"), np.array([0., 1., 3.]))
+    np.save(os.path.join(path, "contents.npy"), np.array(contents))
+    np.save(os.path.join(path, "sumw2.npy"), np.array(contents))
+    with open(os.path.join(path, "index.json"), "w") as indexfile:
+        json.dump({
+            "source": os.path.abspath(source),
+            "fingerprint": array_cache._fingerprint(source),
+            "version": array_cache._format_version,
+            "keys": {"d/h": [0, 3, 0, 4]}
+        }, indexfile)
+
+
+def test_cache_serves_views_until_source_changes(tmpdir):
+    source = str(tmpdir.join("shapes.root"))
+    cache_dir = str(tmpdir.join("cache"))
+    with open(source, "w") as sourcefile:
+        sourcefile.write("x")
+    _write_cache(source, cache_dir, [0., 4., 9., 0.])
+    cache = array_cache.load(source, cache_dir, build=False)
+    edges, contents, err_up, err_down = cache.get_arrays("d/h")
+    assert np.allclose(edges, [0., 1., 3.])
+    assert np.allclose(contents, [4., 9.])
+    assert np.allclose(err_up, [2., 3.])
+    assert not contents.flags.writeable
+    assert not "d/other" in cache
+
+    with open(source, "a") as sourcefile:
+        sourcefile.write("y")
+    assert not cache.is_fresh()
+    assert array_cache.load(source, cache_dir, build=False) == None
@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+import bands
+
+
+# two processes with two bins, systematic a shifts both processes up for Up and down for Down,
+# systematic b shifts the first bin up for both variations
+nominal = [[1., 2.], [3., 4.]]
+up = [[[2., 3.], [1.5, 2.]], [[4., 5.], [3., 4.]]]
+down = [[[0., 1.], [1.5, 2.]], [[2., 3.], [3., 4.]]]
+
+
+def test_shifts_of_a_systematic_are_summed_over_processes():
+    err_up, err_down = bands.combine_shifts(nominal, up, down)
+    assert np.allclose(err_up, [np.sqrt(2. ** 2 + 0.5 ** 2), 2.])
+    assert np.allclose(err_down, [2., 2.])
+
+
+def test_envelope_takes_the_largest_shift():
+    err_up, err_down = bands.combine_shifts(nominal, up, down, method="envelope")
+    assert np.allclose(err_up, [2., 2.])
+    assert np.allclose(err_down, [2., 2.])
+
+
+def test_statistical_uncertainty_is_added_in_quadrature():
+    err_up, err_down = bands.combine_shifts([[1., 2.]], np.zeros((1, 0, 2)), np.zeros((1, 0, 2)), sumw2=[[4., 9.]])
+    assert np.allclose(err_up, [2., 3.])
+    assert np.allclose(err_down, [2., 3.])
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(Exception):
+        bands.combine_shifts(nominal, up, down, method="maximum")
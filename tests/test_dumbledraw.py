@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import array
+
+import numpy as np
+import pytest
+
+R = pytest.importorskip("ROOT")
+import dumbledraw
+import hist_arrays
+
+
+def _hist(name, edges, contents):
+    hist = R.TH1D(name, name, len(edges) - 1, array.array("d", edges))
+    hist.SetDirectory(0)
+    hist.Sumw2()
+    for i, content in enumerate(contents):
+        hist.SetBinContent(i + 1, content)
+        hist.SetBinError(i + 1, content)
+    return hist
+
+
+def test_normalize_by_bin_width_scales_stacked_hist_once():
+    plot = dumbledraw.Plot([], "none")
+    plot.add_hist(_hist("ztt", [0., 1., 3.], [2., 6.]), "ZTT", "bkg")
+    plot.create_stack(["ZTT"], "stack")
+    plot.subplot(0).normalizeByBinWidth()
+    hist = plot.subplot(0).peek_hist("ZTT")
+    assert np.allclose(hist_arrays.get_contents(hist)[1:-1], [2., 3.])
+    assert np.allclose(hist_arrays.get_sumw2(hist)[1:-1], [4., 9.])
+    plot.close()
+
+
+def test_hist_entries_index_as_lists():
+    entry = dumbledraw.HistEntry("graph", "unc", "e2")
+    hist, group, style = entry
+    assert (hist, group, style) == ("graph", "unc", "e2")
+    assert entry[0] == "graph"
+    with pytest.raises(TypeError):
+        entry[0] = "other"
+
+
+def test_unroll_accepts_index_arrays():
+    plot = dumbledraw.Plot([], "none")
+    plot.unroll(["a", "b", "c"], selection=np.array([0, 2]), pads_to_print_labels=np.array([0]))
+    assert list(plot.subplot(0)._selection) == [0, 2]
+
+
+def test_normalize_by_bin_width_scales_mixed_stack_once():
+    plot = dumbledraw.Plot([], "none")
+    plot.add_hist(_hist("ztt", [0., 1., 3.], [2., 6.]), "ZTT", "bkg")
+    plot.add_hist(hist_arrays.ArrayHist("zl", [0., 1., 3.], [4., 8.]), "ZL", "bkg")
+    plot.create_stack(["ZTT", "ZL"], "stack")
+    plot.subplot(0).normalizeByBinWidth()
+    zl = plot.subplot(0).peek_hist("ZL")
+    assert np.allclose(hist_arrays.get_contents(zl)[1:-1], [4., 4.])
+    members = plot.subplot(0).peek_hist("stack").GetHists()
+    assert np.allclose(hist_arrays.get_contents(members.At(0))[1:-1], [2., 3.])
+    assert np.allclose(hist_arrays.get_contents(members.At(1))[1:-1], [4., 4.])
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+import hist_arrays
+
+
+def test_array_hist_keeps_th1_of_stack_up_to_date():
+    pytest.importorskip("ROOT")
+    hist = hist_arrays.ArrayHist("ZTT", [0., 1., 3.], [2., 6.])
+    stack = hist_arrays.ArrayStack("stack")
+    stack.Add(hist)
+    member = stack.th1().GetHists().At(0)
+    hist.Scale(0.5)
+    stack.Modified()
+    assert np.allclose(hist_arrays.get_contents(member)[1:-1], [1., 3.])
+
+
+def test_array_hist_applies_style_in_call_order():
+    R = pytest.importorskip("ROOT")
+    hist = hist_arrays.ArrayHist("ZTT", [0., 1., 3.], [2., 6.])
+    hist.SetFillColorAlpha(R.kRed, 0.5)
+    hist.SetFillColor(R.kBlue)
+    assert hist.th1().GetFillColor() == R.kBlue
+    hist = hist_arrays.ArrayHist("ZTT", [0., 1., 3.], [2., 6.])
+    hist.SetFillColor(R.kBlue)
+    hist.SetFillColorAlpha(R.kRed, 0.5)
+    assert hist.th1().GetFillColor() != R.kBlue
+
+
+# the second cell has a vanishing denominator, the third cell vanishing squared weights
+_cells = [np.array([4., 6., 2.]), np.array([4., 9., 0.]), np.array([2., 0., 2.]), np.array([1., 1., 0.])]
+
+
+@pytest.mark.parametrize("errors, sumw2", [
+    ("numerator", [1., 0., 0.]),
+    ("denominator", [1., 0., 0.]),
+    ("both", [2., 0., 0.]),
+    ("none", [0., 0., 0.]),
+])
+def test_compare_ratio(errors, sumw2):
+    result, result_sumw2 = hist_arrays.compare(*_cells, mode="ratio", errors=errors)
+    assert np.allclose(result, [2., 0., 1.])
+    assert np.allclose(result_sumw2, sumw2)
+
+
+@pytest.mark.parametrize("errors, pull", [
+    ("numerator", [1., 2., 0.]),
+    ("denominator", [2., 6., 0.]),
+    ("both", [2. / np.sqrt(5.), 6. / np.sqrt(10.), 0.]),
+    ("none", [1., 2., 0.]),
+])
+def test_compare_pull(errors, pull):
+    result, result_sumw2 = hist_arrays.compare(*_cells, mode="pull", errors=errors)
+    assert np.allclose(result, pull)
+    assert np.allclose(result_sumw2, 0.)
+
+
+@pytest.mark.parametrize("errors, significance", [
+    ("numerator", [4. / np.sqrt(2.), 0., np.sqrt(2.)]),
+    ("denominator", [4. / np.sqrt(3.), 6., np.sqrt(2.)]),
+    ("both", [4. / np.sqrt(3.), 6., np.sqrt(2.)]),
+    ("none", [4. / np.sqrt(2.), 0., np.sqrt(2.)]),
+])
+def test_compare_significance(errors, significance):
+    result, result_sumw2 = hist_arrays.compare(*_cells, mode="significance", errors=errors)
+    assert np.allclose(result, significance)
+    assert np.allclose(result_sumw2, 0.)
+
+
+def test_compare_rejects_unknown_options():
+    with pytest.raises(Exception):
+        hist_arrays.compare(*_cells, mode="difference")
+    with pytest.raises(Exception):
+        hist_arrays.compare(*_cells, errors="poisson")
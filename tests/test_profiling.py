@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+import profiling
+
+
+class FakeParser(object):
+    def get(self, name):
+        return name
+
+
+class FakePlot(object):
+    def __init__(self):
+        pass
+
+    def close(self):
+        pass
+
+    def save(self, outputname):
+        with open(outputname, "w") as outputfile:
+            outputfile.write("x" * 10)
+
+    def save_all(self, basename, formats=None):
+        for extension in formats:
+            self.save("%s.%s" % (basename, extension))
+
+
+@pytest.fixture
+def enabled(tmpdir, monkeypatch):
+    monkeypatch.setitem(profiling._settings, "enabled", True)
+    monkeypatch.setitem(profiling._settings, "directory", str(tmpdir))
+    monkeypatch.setitem(profiling._settings, "top", 0)
+    profiling.take_records()
+    profiling.take_pending()
+    yield str(tmpdir)
+    profiling.take_records()
+    profiling.take_pending()
+
+
+def test_stages_before_plot_are_attached_to_plot(enabled):
+    get = profiling.timed("Rootfile_parser.get", FakeParser().get)
+    for i in range(3):
+        get("ZTT")
+        get("ZL")
+        profiling.begin_plot()
+        get("data_obs")
+        profiling.end_plot()
+    report = profiling.aggregate(profiling.take_records())
+    assert report["nplots"] == 3
+    assert report["stages"]["Rootfile_parser.get"]["calls"] == 9
+    assert profiling.take_pending() == None
+
+
+def test_instrumented_plot(enabled, monkeypatch):
+    monkeypatch.setattr(FakePlot, "__init__", FakePlot.__init__)
+    monkeypatch.setattr(FakePlot, "close", FakePlot.close)
+    monkeypatch.setattr(FakePlot, "save", FakePlot.save)
+    monkeypatch.setattr(FakePlot, "save_all", FakePlot.save_all)
+    profiling.instrument_plot(FakePlot)
+    for i in range(2):
+        plot = FakePlot()
+        plot.save_all(os.path.join(enabled, "plot%i" % i), ["png", "pdf"])
+        plot.close()
+    records = profiling.take_records()
+    report = profiling.aggregate(records)
+    assert report["nplots"] == 2
+    assert report["bytes_written"] == 40
+    assert report["stages"]["Plot.save_all"]["calls"] == 2
+    assert report["stages"]["Plot.close"]["calls"] == 2
+    assert sum([record["stages"]["Plot.__init__"][0] for record in records]) == 2
+
+
+def test_profiles_are_pruned_over_all_records(enabled, monkeypatch):
+    monkeypatch.setitem(profiling._settings, "top", 1)
+    records = []
+    for pid, duration in [(1, 0.5), (2, 2.), (3, 1.)]:
+        path = os.path.join(enabled, "plot_%i_1.prof" % pid)
+        open(path, "w").close()
+        records.append({"plot": 1, "pid": pid, "time": duration, "stages": {}, "deepcopies": 0,
+                        "bytes_written": 0, "outputs": [], "profile": path})
+    profiling.add_records(records)
+    report = profiling.write_report()
+    assert report["nplots"] == 3
+    assert [record["profile"] != None for record in report["plots"]] == [False, True, False]
+    assert sorted([name for name in os.listdir(enabled) if name.endswith(".prof")]) == ["plot_2_1.prof"]
+
+
+def test_reports_do_not_repeat_earlier_plots(enabled):
+    for pid in [1, 2]:
+        profiling.add_records([{"plot": 1, "pid": pid, "time": 1., "stages": {}, "deepcopies": 0,
+                                "bytes_written": 0, "outputs": [], "profile": None}])
+        report = profiling.write_report()
+        assert [record["pid"] for record in report["plots"]] == [pid]
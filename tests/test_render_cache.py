@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hist_arrays
+import render_cache
+
+
+def _hist(contents):
+    return hist_arrays.ArrayHist("h", [0., 1., 2.], contents)
+
+
+def test_key_depends_on_contents_and_config_only(tmpdir):
+    cache = render_cache.RenderCache(str(tmpdir.join("cache")))
+    key = cache.key([_hist([1., 2.])], {"x_label": "m_vis", "logy": False})
+    assert cache.key([_hist([1., 2.])], {"logy": False, "x_label": "m_vis"}) == key
+    assert cache.key([_hist([1., 3.])], {"x_label": "m_vis", "logy": False}) != key
+    assert cache.key([_hist([1., 2.])], {"x_label": "m_vis", "logy": True}) != key
+
+
+def test_outputs_are_fresh_after_store(tmpdir):
+    cache = render_cache.RenderCache(str(tmpdir.join("cache")))
+    output = tmpdir.join("plot.png")
+    output.write("png")
+    key = cache.key([_hist([1., 2.])], {})
+    assert not cache.is_fresh([str(output)], key)
+    cache.store([str(output)], key)
+    assert cache.is_fresh([str(output)], key)
+    assert not cache.is_fresh([str(output)], cache.key([_hist([1., 3.])], {}))
+    assert (cache.nskipped, cache.nrendered) == (1, 1)
+
+
+def test_missing_output_is_not_fresh(tmpdir):
+    cache = render_cache.RenderCache(str(tmpdir.join("cache")))
+    output = tmpdir.join("plot.png")
+    output.write("png")
+    key = cache.key([], {})
+    cache.store([str(output)], key)
+    output.remove()
+    assert not cache.is_fresh([str(output)], key)
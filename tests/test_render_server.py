@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+pytest.importorskip("ROOT")
+import render_server
+
+
+class FakeSource(object):
+    def __init__(self, input_spec):
+        self.input_spec = input_spec
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_modified_input_evicts_all_sources_of_the_file(tmpdir, monkeypatch):
+    shapes = tmpdir.join("shapes.root")
+    shapes.write("x")
+    closed = []
+    monkeypatch.setattr(render_server.plotspec, "open_input", FakeSource)
+    monkeypatch.setattr(render_server.rootfile_pool, "close", lambda filename, force=False: closed.append(filename))
+    server = object.__new__(render_server.RenderServer)
+    server._sources = {}
+    m_vis = server._source({"file": str(shapes), "parser": "inputshapes", "variable": "m_vis"})
+    pt_1 = server._source({"file": str(shapes), "parser": "inputshapes", "variable": "pt_1"})
+    assert server._source({"file": str(shapes), "parser": "inputshapes", "variable": "m_vis"}) is m_vis
+
+    os.utime(str(shapes), (1., 1.))
+    reopened = server._source({"file": str(shapes), "parser": "inputshapes", "variable": "m_vis"})
+    assert reopened is not m_vis
+    assert m_vis.closed and pt_1.closed
+    assert closed == [str(shapes)]
+    assert len(server._sources) == 1
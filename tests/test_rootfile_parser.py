@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+R = pytest.importorskip("ROOT")
+
+import rootfile_parser
+import rootfile_pool
+
+_directory = "htt_mt_inclusive_2016"
+
+
+# control plot file of CombineHarvester with the process ggH and the process ggH_htt, whose names share the prefix ggH_
+@pytest.fixture
+def shapes(tmpdir):
+    filename = str(tmpdir.join("shapes.root"))
+    rootfile = R.TFile(filename, "RECREATE")
+    rootfile.mkdir(_directory).cd()
+    for name, content in [("ZTT", 10.), ("ZTT_CMS_scaleUp", 12.), ("ZTT_CMS_scaleDown", 9.),
+                          ("ggH", 1.), ("ggH_CMS_yUp", 2.), ("ggH_CMS_yDown", 0.5),
+                          ("ggH_htt", 3.), ("ggH_htt_CMS_xUp", 4.), ("ggH_htt_CMS_xDown", 2.)]:
+        hist = R.TH1F(name, name, 2, 0., 2.)
+        hist.SetBinContent(1, content)
+        hist.Write()
+    rootfile.Close()
+    yield filename
+    rootfile_pool.close_all()
+
+
+def test_key_list_of_each_directory_is_walked_once(shapes):
+    parser = rootfile_parser.Rootfile_parser(shapes)
+    parser.get("2016", "mt", "inclusive", "ZTT")
+    parser.get("2016", "mt", "inclusive", "ZTT", "CMS_scaleUp")
+    parser.exists("2016", "mt", "inclusive", "W")
+    parser.available_systematics("2016", "mt", "inclusive", "ZTT")
+    rootfile_parser.Rootfile_parser(shapes).get("2016", "mt", "inclusive", "ggH")
+    assert parser.key_list_walks == {"": 1, _directory: 1}
+
+
+def test_get_many_returns_empty_dummies_for_missing_shapes(shapes):
+    parser = rootfile_parser.Rootfile_parser(shapes)
+    hists = parser.get_many("2016", "mt", "inclusive", ["ZTT", "W"], [None, "CMS_scaleUp"])
+    assert len(hists) == 4
+    assert hists[("2016", "mt", "inclusive", "ZTT", "CMS_scaleUp")].GetBinContent(1) == 12.
+    dummy = hists[("2016", "mt", "inclusive", "W", None)]
+    assert dummy.GetName() == _directory + "/W"
+    assert dummy.GetTitle() == "W"
+    assert dummy.Integral() == 0.
+    # the template held by the file is not reset
+    assert parser.get("2016", "mt", "inclusive", "ZTT").GetBinContent(1) == 10.
+
+
+def test_systematics_of_processes_sharing_a_prefix_are_separated(shapes):
+    parser = rootfile_parser.Rootfile_parser(shapes)
+    assert parser.available_systematics("2016", "mt", "inclusive", "ggH") == ["CMS_y"]
+    assert parser.available_systematics("2016", "mt", "inclusive", "ggH_htt") == ["CMS_x"]
+    assert parser.available_systematics("2016", "mt", "inclusive", "ZTT") == ["CMS_scale"]
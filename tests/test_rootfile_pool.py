@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import types
+
+import pytest
+
+import rootfile_pool
+
+
+class FakeKey(object):
+    def __init__(self, name):
+        self._name = name
+
+    def GetName(self):
+        return self._name
+
+
+# file with a single directory d holding the histograms ZTT and ZL
+class FakeTFile(object):
+    def __init__(self, filename, mode):
+        self.nclosed = 0
+
+    def Get(self, name):
+        return self if name == "d" else None
+
+    def GetListOfKeys(self):
+        return [FakeKey("ZTT"), FakeKey("ZL")]
+
+    def Close(self):
+        self.nclosed += 1
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    module = types.ModuleType("ROOT")
+    module.TFile = FakeTFile
+    monkeypatch.setitem(sys.modules, "ROOT", module)
+    yield rootfile_pool
+    rootfile_pool.close_all()
+
+
+def test_parsers_share_one_handle(pool):
+    first = pool.acquire("shapes.root")
+    second = pool.acquire("shapes.root")
+    assert first is second
+    assert first.refcount == 2
+    pool.release(first)
+    pool.close("shapes.root")
+    assert not first.closed
+
+
+def test_forced_close_invalidates_the_handle(pool):
+    pooled = pool.acquire("shapes.root")
+    assert pooled.keys("d")[0] == ["ZTT", "ZL"]
+    pool.close("shapes.root", force=True)
+    assert pooled.closed
+    with pytest.raises(Exception):
+        pooled.keys("d")
+    with pytest.raises(Exception):
+        pooled.rootfile
+    assert pool.acquire("shapes.root") is not pooled
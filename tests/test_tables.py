@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import tables
+
+
+def test_lazy_list_loads_on_first_access():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return ["data", "ZTT"]
+
+    names = tables.LazyList(loader)
+    assert not names.loaded
+    assert calls == []
+    assert names[0] == "data"
+    assert list(names) == ["data", "ZTT"]
+    assert len(names) == 2
+    assert calls == [1]
+
+
+def _load_yaml_again(path):
+    # the parsed content is kept per process, so it is dropped to read the file or the pickle cache again
+    tables._parsed.pop(path, None)
+    return tables.load_yaml(path)
+
+
+def test_yaml_is_parsed_again_if_the_file_changes(tmpdir, monkeypatch):
+    monkeypatch.setattr(tables, "_parsed", {})
+    monkeypatch.setattr(tables, "_cache_dir", [str(tmpdir.join("cache"))])
+    path = str(tmpdir.join("names.yaml"))
+    tmpdir.join("names.yaml").write("[data, ZTT]\n")
+    assert tables.load_yaml(path) == ["data", "ZTT"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("parsed although the pickle cache is up to date")
+
+    load = tables.yaml.load
+    monkeypatch.setattr(tables.yaml, "load", fail)
+    assert _load_yaml_again(path) == ["data", "ZTT"]
+
+    tmpdir.join("names.yaml").write("[data, ZTT, ZL]\n")
+    monkeypatch.setattr(tables.yaml, "load", load)
+    assert _load_yaml_again(path) == ["data", "ZTT", "ZL"]
+
+
+def test_extended_dict_loads_extension_for_missing_keys_only():
+    calls = []
+
+    def extension():
+        calls.append(1)
+        return {"NMSSM_500_125_60": "NMSSM"}
+
+    processes = tables.ExtendedDict({"ZTT": "DY-ZTT"}, extension)
+    assert processes["ZTT"] == "DY-ZTT"
+    assert "ZTT" in processes
+    assert calls == []
+    assert processes["NMSSM_500_125_60"] == "NMSSM"
+    assert sorted(processes) == ["NMSSM_500_125_60", "ZTT"]
+    assert calls == [1]
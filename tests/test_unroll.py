@@ -0,0 +1,18 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+pytest.importorskip("ROOT")
+import hist_arrays
+import unroll
+
+
+def test_unroll_array_accepts_numpy_selection():
+    contents = np.arange(6, dtype=np.float64).reshape((3, 2))
+    hist, labels, selection = unroll.unroll_array(contents, [0., 1., 2.], [0., 10., 20., 30.],
+                                                  selection=np.array([0, 2]), slice_name="p_{T}")
+    assert np.allclose(hist_arrays.get_contents(hist)[1:-1], [0., 1., 4., 5.])
+    assert labels == ["0 < p_{T} < 10", "20 < p_{T} < 30"]
+    assert list(selection) == [0, 1]
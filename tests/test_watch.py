@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import types
+
+import pytest
+
+import watch
+
+
+# input file whose histogram contents are given by a dictionary of content hashes
+class FakeInput(object):
+    def __init__(self, path):
+        self.path = path
+        self.hashes = {"ZTT": "a", "ZL": "b"}
+        self.write("x")
+
+    def write(self, content):
+        with open(self.path, "w") as inputfile:
+            inputfile.write(content)
+
+    def change(self, key, digest):
+        self.hashes[key] = digest
+        # a different size, so that the change is seen independent of the resolution of the modification time
+        self.write("x" * (os.path.getsize(self.path) + 1))
+
+    def hash_keys(self, path, keys):
+        return dict((key, self.hashes.get(key)) for key in keys)
+
+
+@pytest.fixture
+def shapes(tmpdir, monkeypatch):
+    shapes = FakeInput(str(tmpdir.join("shapes.root")))
+    monkeypatch.setattr(watch, "hash_keys", shapes.hash_keys)
+    monkeypatch.setattr(watch.rootfile_pool, "close", lambda filename, force=False: None)
+    return shapes
+
+
+# campaign runner rendering the specs in this process, each spec reads the histograms listed in "reads"
+def _fake_campaign(shapes, rendered, during_render=None):
+    def run_campaign(function, specs, **kwargs):
+        rendered.append([spec["name"] for spec in specs])
+        results = []
+        for spec in specs:
+            keys = [[os.path.abspath(shapes.path), key, shapes.hashes[key]] for key in spec["reads"]]
+            results.append({"error": None, "result": {"outputs": [], "keys": keys}})
+        if during_render != None:
+            during_render()
+        return results
+    module = types.ModuleType("campaign")
+    module.run_campaign = run_campaign
+    return module
+
+
+def _watcher(shapes):
+    specs = [
+        {"name": "ztt", "input": {"file": shapes.path}, "reads": ["ZTT"]},
+        {"name": "zl", "input": {"file": shapes.path}, "reads": ["ZL"]},
+        {"name": "both", "input": {"file": shapes.path}, "reads": ["ZTT", "ZL"]},
+    ]
+    return watch.Watcher(specs, interval=0.)
+
+
+def test_only_plots_reading_changed_histograms_are_rendered(shapes, monkeypatch):
+    rendered = []
+    monkeypatch.setitem(sys.modules, "campaign", _fake_campaign(shapes, rendered))
+    watcher = _watcher(shapes)
+    watcher.render(range(3))
+    assert watcher.update() == []
+
+    shapes.change("ZL", "c")
+    # the change is handled once the file is stable for one interval
+    assert watcher.update() == []
+    assert watcher.update() == [1, 2]
+    assert rendered[-1] == ["zl", "both"]
+    assert watcher.update() == []
+
+    # rewritten with identical contents
+    shapes.change("ZL", "c")
+    watcher.update()
+    assert watcher.update() == []
+    assert watcher.nrendered == 5
+
+
+def test_change_during_render_is_detected(shapes, monkeypatch):
+    rendered = []
+    monkeypatch.setitem(sys.modules, "campaign",
+                        _fake_campaign(shapes, rendered, lambda: shapes.change("ZTT", "d")))
+    watcher = _watcher(shapes)
+    watcher.render(range(3))
+    monkeypatch.setitem(sys.modules, "campaign", _fake_campaign(shapes, rendered))
+    watcher.update()
+    assert watcher.update() == [0, 2]